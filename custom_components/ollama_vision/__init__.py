@@ -1,8 +1,12 @@
 """The Ollama Vision integration."""
+import asyncio
 import logging
+import os
+import time
+from datetime import timedelta
 import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.core import HomeAssistant, SupportsResponse, callback
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.helpers import config_validation as cv
 from homeassistant.exceptions import HomeAssistantError
@@ -10,6 +14,9 @@ from homeassistant.const import CONF_NAME, Platform
 import homeassistant.helpers.entity_registry as er
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
 from homeassistant.helpers.config_validation import config_entry_only_config_schema
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.util import slugify
 from .const import (
     DOMAIN,
@@ -20,8 +27,18 @@ from .const import (
     ATTR_PROMPT,
     ATTR_IMAGE_NAME,
     ATTR_DEVICE_ID,
+    ATTR_CAMERA_ENTITY,
+    CAMERA_PROXY_PATH,
     SERVICE_ANALYZE_IMAGE,
+    SERVICE_ANALYZE_IMAGES,
+    ATTR_IMAGES,
+    BATCH_PREFETCH,
+    SERVICE_COMPARE_IMAGES,
+    ATTR_IMAGE_URLS,
+    DEFAULT_COMPARE_PROMPT,
+    MAX_COMPARE_IMAGES,
     EVENT_IMAGE_ANALYZED,
+    EVENT_STREAM_CHUNK,
     ATTR_USE_TEXT_MODEL,
     ATTR_TEXT_PROMPT,
     CONF_TEXT_MODEL_ENABLED,
@@ -35,32 +52,160 @@ from .const import (
     CONF_VISION_KEEPALIVE,
     DEFAULT_PROMPT,
     DEFAULT_TEXT_PROMPT,
+    CONF_POOL_SIZE,
+    DEFAULT_POOL_SIZE,
+    CONF_CONNECT_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+    CONF_FIRST_TOKEN_TIMEOUT,
+    DEFAULT_FIRST_TOKEN_TIMEOUT,
+    CONF_REQUEST_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    CONF_RETRIES,
+    DEFAULT_RETRIES,
+    CONF_WARMUP,
+    DEFAULT_WARMUP,
+    SERVICE_WARM_UP,
+    RESIDENCY_POLL_INTERVAL,
+    CONF_MAX_CONCURRENT,
+    DEFAULT_MAX_CONCURRENT,
+    CONF_QUEUE_SIZE,
+    DEFAULT_QUEUE_SIZE,
+    CONF_OVERFLOW_POLICY,
+    DEFAULT_OVERFLOW_POLICY,
+    CONF_COALESCE,
+    DEFAULT_COALESCE,
+    CONF_CACHE_SIZE,
+    DEFAULT_CACHE_SIZE,
+    CONF_CACHE_TTL,
+    DEFAULT_CACHE_TTL,
+    CONF_CACHE_PERSIST,
+    DEFAULT_CACHE_PERSIST,
+    CACHE_STORAGE_VERSION,
+    CONF_SCENE_THRESHOLD,
+    DEFAULT_SCENE_THRESHOLD,
+    CONF_MAX_DIMENSION,
+    DEFAULT_MAX_DIMENSION,
+    CONF_IMAGE_FORMAT,
+    DEFAULT_IMAGE_FORMAT,
+    IMAGE_FORMATS,
+    CONF_IMAGE_QUALITY,
+    DEFAULT_IMAGE_QUALITY,
+    ATTR_MAX_DIMENSION,
+    ATTR_IMAGE_FORMAT,
+    ATTR_IMAGE_QUALITY,
+    ATTR_CROP,
+    ATTR_STREAM,
+    ATTR_FORMAT,
+    CONF_STREAM_UPDATES,
+    DEFAULT_STREAM_UPDATES,
+    STREAM_UPDATE_INTERVAL,
+    CONF_PIPELINE_TEXT,
+    DEFAULT_PIPELINE_TEXT,
+    CONF_CHAT_API,
+    DEFAULT_CHAT_API,
+    CONF_WATCH_DIRECTORIES,
+    DEFAULT_WATCH_DIRECTORIES,
+    CONF_WATCH_PATTERNS,
+    DEFAULT_WATCH_PATTERNS,
+    CONF_WATCH_DEBOUNCE,
+    DEFAULT_WATCH_DEBOUNCE,
+    SIGNAL_STATS_UPDATED,
+    STATS_UPDATE_INTERVAL,
     __version__,
     INTEGRATION_NAME,
     MANUFACTURER,
 )
 from .api import OllamaClient
+from .scheduler import AnalysisScheduler, AnalysisDropped
+from .cache import ResultCache, cache_storage_key
+from .results import ResultStore
+from .metrics import AnalysisMetrics, STAGES, tokens_per_second
+from .structured import parse_structured
+from .watcher import DirectoryWatcher
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [Platform.SENSOR]
 CONFIG_SCHEMA = config_entry_only_config_schema(DOMAIN)
 
+def _camera_entity_source(data):
+    """Replace a camera_entity with its camera proxy URL, which is read in-process."""
+    if ATTR_CAMERA_ENTITY in data:
+        data = {**data, ATTR_IMAGE_URL: f"{CAMERA_PROXY_PATH}{data[ATTR_CAMERA_ENTITY]}"}
+    return data
+
 # Service schema
-ANALYZE_IMAGE_SCHEMA = vol.Schema(
+ANALYZE_IMAGE_SCHEMA = vol.All(vol.Schema(
+    {
+        vol.Exclusive(ATTR_IMAGE_URL, "image_source"): cv.string,
+        vol.Exclusive(ATTR_CAMERA_ENTITY, "image_source"): cv.entity_domain("camera"),
+        vol.Optional(ATTR_PROMPT, default=DEFAULT_PROMPT): cv.string,
+        vol.Required(ATTR_IMAGE_NAME): cv.string,
+        vol.Optional(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_USE_TEXT_MODEL, default=False): cv.boolean,
+        vol.Optional(ATTR_TEXT_PROMPT, default=DEFAULT_TEXT_PROMPT): cv.string,
+        vol.Optional(ATTR_MAX_DIMENSION): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_IMAGE_FORMAT): vol.In(IMAGE_FORMATS),
+        vol.Optional(ATTR_IMAGE_QUALITY): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional(ATTR_CROP): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(int), vol.Range(min=0))], vol.Length(min=4, max=4)
+        ),
+        vol.Optional(ATTR_STREAM): cv.boolean,
+        vol.Optional(ATTR_FORMAT): vol.Any("json", dict),
+    }
+), cv.has_at_least_one_key(ATTR_IMAGE_URL, ATTR_CAMERA_ENTITY), _camera_entity_source)
+
+ANALYZE_IMAGES_ITEM_SCHEMA = vol.All(vol.Schema(
     {
-        vol.Required(ATTR_IMAGE_URL): cv.string,
+        vol.Exclusive(ATTR_IMAGE_URL, "image_source"): cv.string,
+        vol.Exclusive(ATTR_CAMERA_ENTITY, "image_source"): cv.entity_domain("camera"),
+        vol.Required(ATTR_IMAGE_NAME): cv.string,
+        vol.Optional(ATTR_PROMPT): cv.string,
+    }
+), cv.has_at_least_one_key(ATTR_IMAGE_URL, ATTR_CAMERA_ENTITY), _camera_entity_source)
+
+ANALYZE_IMAGES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_IMAGES): vol.All(
+            cv.ensure_list, [ANALYZE_IMAGES_ITEM_SCHEMA], vol.Length(min=1)
+        ),
         vol.Optional(ATTR_PROMPT, default=DEFAULT_PROMPT): cv.string,
+        vol.Optional(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_USE_TEXT_MODEL, default=False): cv.boolean,
+        vol.Optional(ATTR_TEXT_PROMPT, default=DEFAULT_TEXT_PROMPT): cv.string,
+        vol.Optional(ATTR_MAX_DIMENSION): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_IMAGE_FORMAT): vol.In(IMAGE_FORMATS),
+        vol.Optional(ATTR_IMAGE_QUALITY): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional(ATTR_FORMAT): vol.Any("json", dict),
+    }
+)
+
+COMPARE_IMAGES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_IMAGE_URLS): vol.All(
+            cv.ensure_list, [cv.string], vol.Length(min=2, max=MAX_COMPARE_IMAGES)
+        ),
+        vol.Optional(ATTR_PROMPT, default=DEFAULT_COMPARE_PROMPT): cv.string,
         vol.Required(ATTR_IMAGE_NAME): cv.string,
         vol.Optional(ATTR_DEVICE_ID): cv.string,
         vol.Optional(ATTR_USE_TEXT_MODEL, default=False): cv.boolean,
         vol.Optional(ATTR_TEXT_PROMPT, default=DEFAULT_TEXT_PROMPT): cv.string,
+        vol.Optional(ATTR_MAX_DIMENSION): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional(ATTR_IMAGE_FORMAT): vol.In(IMAGE_FORMATS),
+        vol.Optional(ATTR_IMAGE_QUALITY): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional(ATTR_STREAM): cv.boolean,
+        vol.Optional(ATTR_FORMAT): vol.Any("json", dict),
+    }
+)
+
+WARM_UP_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DEVICE_ID): cv.string,
     }
 )
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Ollama Vision component."""
     hass.data[DOMAIN] = {}
-    hass.data[DOMAIN]["pending_sensors"] = {}
     hass.data[DOMAIN]["created_sensors"] = {}
     return True
 
@@ -100,11 +245,95 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         text_model = entry.options.get(CONF_TEXT_MODEL) or entry.data.get(CONF_TEXT_MODEL, DEFAULT_TEXT_MODEL)
         text_keepalive = entry.options.get(CONF_TEXT_KEEPALIVE) or entry.data.get(CONF_TEXT_KEEPALIVE, DEFAULT_KEEPALIVE)
     
-    client = OllamaClient(hass, host, port, model, text_host, text_port, text_model, vision_keepalive, text_keepalive)
+    pool_size = entry.options.get(CONF_POOL_SIZE, DEFAULT_POOL_SIZE)
+    
+    # Every counter change asks for an update, but the diagnostic sensors are written at most
+    # once per STATS_UPDATE_INTERVAL, so a burst of analyses doesn't flood the recorder
+    unsub_stats_update = None
+    
+    @callback
+    def async_send_stats(now=None):
+        """Notify the diagnostic sensors."""
+        nonlocal unsub_stats_update
+        unsub_stats_update = None
+        async_dispatcher_send(hass, SIGNAL_STATS_UPDATED.format(entry.entry_id))
+    
+    @callback
+    def async_stats_updated():
+        """Schedule a notification of the diagnostic sensors, unless one is pending."""
+        nonlocal unsub_stats_update
+        if unsub_stats_update is None:
+            unsub_stats_update = async_call_later(hass, STATS_UPDATE_INTERVAL, async_send_stats)
+    
+    @callback
+    def async_cancel_stats_update():
+        """Drop a pending notification when the entry is unloaded."""
+        if unsub_stats_update is not None:
+            unsub_stats_update()
+    
+    entry.async_on_unload(async_cancel_stats_update)
+    
+    # Cache of descriptions for identical images, optionally persisted across restarts
+    result_cache = ResultCache(
+        hass,
+        entry.entry_id,
+        max_entries=entry.options.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE),
+        ttl=entry.options.get(CONF_CACHE_TTL, DEFAULT_CACHE_TTL),
+        persist=entry.options.get(CONF_CACHE_PERSIST, DEFAULT_CACHE_PERSIST),
+        update_callback=async_stats_updated,
+    )
+    await result_cache.async_load()
+    
+    client = OllamaClient(
+        hass, host, port, model, text_host, text_port, text_model, vision_keepalive, text_keepalive,
+        pool_size=pool_size,
+        result_cache=result_cache,
+        scene_threshold=entry.options.get(CONF_SCENE_THRESHOLD, DEFAULT_SCENE_THRESHOLD),
+        image_options={
+            CONF_MAX_DIMENSION: entry.options.get(CONF_MAX_DIMENSION, DEFAULT_MAX_DIMENSION),
+            CONF_IMAGE_FORMAT: entry.options.get(CONF_IMAGE_FORMAT, DEFAULT_IMAGE_FORMAT),
+            CONF_IMAGE_QUALITY: entry.options.get(CONF_IMAGE_QUALITY, DEFAULT_IMAGE_QUALITY),
+        },
+        update_callback=async_stats_updated,
+        connect_timeout=entry.options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+        first_token_timeout=entry.options.get(CONF_FIRST_TOKEN_TIMEOUT, DEFAULT_FIRST_TOKEN_TIMEOUT),
+        request_timeout=entry.options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+        retries=entry.options.get(CONF_RETRIES, DEFAULT_RETRIES),
+        use_chat=entry.options.get(CONF_CHAT_API, DEFAULT_CHAT_API),
+    )
+    await client.async_open()
+    
+    # Bound how many analyses run against this entry's Ollama server at once
+    scheduler = AnalysisScheduler(
+        hass,
+        max_in_flight=entry.options.get(CONF_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT),
+        queue_size=entry.options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+        overflow_policy=entry.options.get(CONF_OVERFLOW_POLICY, DEFAULT_OVERFLOW_POLICY),
+        coalesce=entry.options.get(CONF_COALESCE, DEFAULT_COALESCE),
+        update_callback=async_stats_updated,
+    )
+    
+    # With pipelining, text elaborations get their own slots so they overlap the next
+    # images' vision stage (worthwhile when the text model runs on another server)
+    text_scheduler = None
+    if text_model_enabled:
+        text_scheduler = AnalysisScheduler(
+            hass,
+            max_in_flight=entry.options.get(CONF_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT),
+            queue_size=entry.options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+            overflow_policy=entry.options.get(CONF_OVERFLOW_POLICY, DEFAULT_OVERFLOW_POLICY),
+            coalesce=entry.options.get(CONF_COALESCE, DEFAULT_COALESCE),
+            update_callback=async_stats_updated,
+        )
     
     # Store the client in hass.data
     hass.data[DOMAIN][entry.entry_id] = {
         "client": client,
+        "scheduler": scheduler,
+        "text_scheduler": text_scheduler,
+        "cache": result_cache,
+        "metrics": AnalysisMetrics(update_callback=async_stats_updated),
+        "results": ResultStore(),
         "sensors": {},
         "config": {
             CONF_HOST: host,  # host may contain hostname:port or full URL
@@ -113,7 +342,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             CONF_TEXT_MODEL_ENABLED: text_model_enabled,
             CONF_TEXT_HOST: text_host,  # host may contain hostname:port or full URL
             CONF_TEXT_MODEL: text_model,
-            CONF_TEXT_KEEPALIVE: text_keepalive
+            CONF_TEXT_KEEPALIVE: text_keepalive,
+            CONF_STREAM_UPDATES: entry.options.get(CONF_STREAM_UPDATES, DEFAULT_STREAM_UPDATES),
+            CONF_PIPELINE_TEXT: entry.options.get(CONF_PIPELINE_TEXT, DEFAULT_PIPELINE_TEXT),
         },
         "device_info": {
             "identifiers": {(DOMAIN, entry.entry_id)},
@@ -125,10 +356,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     }
     
     # Create service handler wrapper
-    @callback
-    def async_handle_service(call):
+    async def async_handle_service(call):
         """Handle the service call."""
-        hass.async_create_task(handle_analyze_image(hass, call))
+        if not call.return_response:
+            # No response requested: return at once, the result arrives via the sensor and event
+            hass.async_create_task(handle_analyze_image(hass, call))
+            return None
+        return await handle_analyze_image(hass, call)
     
     # Register service with the wrapper
     hass.services.async_register(
@@ -136,6 +370,27 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         SERVICE_ANALYZE_IMAGE,
         async_handle_service,
         schema=ANALYZE_IMAGE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_COMPARE_IMAGES,
+        async_handle_service,
+        schema=COMPARE_IMAGES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    
+    async def async_handle_batch_service(call):
+        """Handle the batch service call."""
+        response = await handle_analyze_images(hass, call)
+        return response if call.return_response else None
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ANALYZE_IMAGES,
+        async_handle_batch_service,
+        schema=ANALYZE_IMAGES_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     
     # Check if the text model is enabled and remove the sensor if it exists and the model is disabled
@@ -153,6 +408,70 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Create update listener
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     
+    async def async_handle_warm_up(call):
+        """Handle the warm_up service call."""
+        entry_id_to_use = _resolve_entry_id(hass, call.data.get(ATTR_DEVICE_ID))
+        await hass.data[DOMAIN][entry_id_to_use]["client"].async_warm_up()
+    
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_WARM_UP,
+        async_handle_warm_up,
+        schema=WARM_UP_SCHEMA,
+    )
+    
+    # Keep track of which models are loaded, and with warm-up enabled reload them
+    # after an Ollama restart or keep_alive expiry before the next camera event needs them
+    warm_up = entry.options.get(CONF_WARMUP, DEFAULT_WARMUP)
+    
+    async def async_poll_models(now=None):
+        """Poll the loaded models and warm up the ones that were unloaded."""
+        await client.async_update_residency()
+        if warm_up:
+            await client.async_warm_up(only_missing=True)
+    
+    entry.async_on_unload(
+        async_track_time_interval(hass, async_poll_models, timedelta(seconds=RESIDENCY_POLL_INTERVAL))
+    )
+    entry.async_create_background_task(
+        hass,
+        client.async_warm_up() if warm_up else client.async_update_residency(),
+        f"{DOMAIN} warm-up {entry.entry_id}",
+    )
+    
+    # Analyze the images written to the watched directories
+    watch_directories = await hass.async_add_executor_job(
+        _watch_directories, hass, entry.options.get(CONF_WATCH_DIRECTORIES, DEFAULT_WATCH_DIRECTORIES)
+    )
+    if watch_directories:
+        async def async_analyze_watched_file(path):
+            """Analyze an image that was written to a watched directory."""
+            image_url = os.path.relpath(path, os.path.realpath(hass.config.config_dir))
+            if image_url.startswith(os.pardir):
+                image_url = path
+            data = {
+                ATTR_IMAGE_URL: image_url,
+                ATTR_IMAGE_NAME: os.path.splitext(image_url)[0],
+                ATTR_USE_TEXT_MODEL: text_model_enabled,
+            }
+            try:
+                await _async_queue_analysis(hass, entry.entry_id, data)
+            except AnalysisDropped as exc:
+                _LOGGER.warning("Skipped analysis of %s: %s", image_url, exc)
+            except HomeAssistantError as exc:
+                _LOGGER.warning("Analysis of %s failed: %s", image_url, exc)
+        
+        watcher = DirectoryWatcher(
+            hass,
+            entry,
+            watch_directories,
+            [pattern.strip() for pattern in entry.options.get(CONF_WATCH_PATTERNS, DEFAULT_WATCH_PATTERNS).split(",") if pattern.strip()],
+            entry.options.get(CONF_WATCH_DEBOUNCE, DEFAULT_WATCH_DEBOUNCE),
+            async_analyze_watched_file,
+        )
+        await watcher.async_start()
+        entry.async_on_unload(watcher.async_stop)
+    
     # Set up platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     
@@ -162,20 +481,8 @@ async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> Non
     """Handle options update."""
     await hass.config_entries.async_reload(entry.entry_id)
 
-# Define the analyze_image service outside of async_setup_entry
-async def handle_analyze_image(hass, call):
-    """Handle the analyze_image service call."""
-    image_url = call.data.get(ATTR_IMAGE_URL)
-    vision_prompt = call.data.get(ATTR_PROMPT, DEFAULT_PROMPT)
-    image_name = call.data.get(ATTR_IMAGE_NAME)
-    device_id = call.data.get(ATTR_DEVICE_ID)
-    use_text_model = call.data.get(ATTR_USE_TEXT_MODEL, False)
-    text_prompt = call.data.get(ATTR_TEXT_PROMPT, DEFAULT_TEXT_PROMPT)
-    
-    # Properly slugify the image name to ensure consistent IDs
-    slugified_image_name = slugify(image_name)
-    
-    # Determine which integration to use based on device_id
+def _resolve_entry_id(hass, device_id):
+    """Return the config entry to use for a service call."""
     entry_id_to_use = None
     
     if device_id:
@@ -192,7 +499,7 @@ async def handle_analyze_image(hass, call):
                     break
     
     if not entry_id_to_use:
-        # Filter out non-integration keys like "pending_sensors" or "created_sensors"
+        # Filter out non-integration keys like "created_sensors"
         valid_entry_ids = [
             k for k, v in hass.data[DOMAIN].items()
             if isinstance(v, dict) and "client" in v
@@ -209,67 +516,401 @@ async def handle_analyze_image(hass, call):
         # Pick the first valid entry
         entry_id_to_use = valid_entry_ids[0]
     
+    return entry_id_to_use
+
+async def _async_submit_analysis(scheduler, key, job):
+    """
+    Run an analysis on the scheduler and return its event data.
+    
+    With the text model pipelined the job returns as soon as the vision model is done,
+    handing back the task that runs the text stage; wait for that too. It is shielded
+    because coalesced callers share it.
+    """
+    result = await scheduler.async_submit(key, job)
+    if isinstance(result, asyncio.Future):
+        result = await asyncio.shield(result)
+    return result
+
+# Define the analyze_image service outside of async_setup_entry
+async def handle_analyze_image(hass, call):
+    """
+    Handle the analyze_image and compare_images service calls.
+    
+    Returns the event data, including timings. If the caller waits for a response, a failed
+    or dropped analysis raises instead of only being logged.
+    """
+    image_name = call.data.get(ATTR_IMAGE_NAME)
+    entry_id_to_use = _resolve_entry_id(hass, call.data.get(ATTR_DEVICE_ID))
+    try:
+        result = await _async_queue_analysis(hass, entry_id_to_use, call.data)
+    except AnalysisDropped as exc:
+        if call.return_response:
+            raise
+        _LOGGER.warning("Skipped analysis of %s: %s", image_name, exc)
+        return None
+    return result
+
+async def _async_queue_analysis(hass, entry_id_to_use, data):
+    """Analyze one image on the entry's scheduler and return the event data."""
+    scheduler = hass.data[DOMAIN][entry_id_to_use]["scheduler"]
+    submitted = time.monotonic()
+    
+    async def _job():
+        return await _async_analyze_image(hass, entry_id_to_use, data, submitted=submitted)
+    
+    # Wait for a free slot on this entry's scheduler. Calls are keyed on the image name,
+    # so in coalescing mode a newer call for the same image replaces the queued one.
+    return await _async_submit_analysis(scheduler, slugify(data[ATTR_IMAGE_NAME]), _job)
+
+async def handle_analyze_images(hass, call):
+    """Handle the analyze_images service call and return the result of every image."""
+    entry_id_to_use = _resolve_entry_id(hass, call.data.get(ATTR_DEVICE_ID))
+    client = hass.data[DOMAIN][entry_id_to_use]["client"]
+    scheduler = hass.data[DOMAIN][entry_id_to_use]["scheduler"]
+    shared = {key: value for key, value in call.data.items() if key not in (ATTR_IMAGES, ATTR_DEVICE_ID)}
+    image_options = _image_options(shared)
+    
+    # Images are fetched and preprocessed while earlier ones are being analyzed, but only a
+    # few ahead of the scheduler, so a large batch neither buffers every image at once nor
+    # floods the queue (which would drop items under the overflow policy).
+    window = asyncio.Semaphore(scheduler.max_in_flight + BATCH_PREFETCH)
+    started = time.monotonic()
+    
+    async def _async_run(item):
+        data = {**shared, **item}
+        image_name = data[ATTR_IMAGE_NAME]
+        item_started = time.monotonic()
+        result = {"image_name": image_name, "image_url": data[ATTR_IMAGE_URL]}
+        async with window:
+            try:
+                prepared = await client.async_prepare_image(
+                    data[ATTR_IMAGE_URL],
+                    data[ATTR_PROMPT],
+                    slugify(image_name),
+                    image_options,
+                    buffer=True,
+                    response_format=data.get(ATTR_FORMAT),
+                )
+                if prepared is None:
+                    raise HomeAssistantError("Failed to fetch image")
+                
+                submitted = time.monotonic()
+                
+                async def _job():
+                    return await _async_analyze_image(
+                        hass, entry_id_to_use, data, prepared, submitted=submitted
+                    )
+                
+                result.update(await _async_submit_analysis(scheduler, slugify(image_name), _job))
+                result["success"] = True
+            except Exception as exc:  # pylint: disable=broad-except
+                _LOGGER.warning("Batch analysis of %s failed: %s", image_name, exc)
+                result["success"] = False
+                result["error"] = str(exc)
+        result["duration"] = round(time.monotonic() - item_started, 3)
+        return result
+    
+    results = await asyncio.gather(*(_async_run(item) for item in call.data[ATTR_IMAGES]))
+    return {
+        "results": list(results),
+        "succeeded": sum(1 for result in results if result["success"]),
+        "failed": sum(1 for result in results if not result["success"]),
+        "wall_time": round(time.monotonic() - started, 3),
+    }
+
+def _display_url(image_url):
+    """Return the URL under which an image can be displayed."""
+    # Replace 'www/' with 'local/' if applicable
+    # If the image is within /config/www, it will actually 
+    # be displayed in companion app notifications
+    if image_url.startswith("www/"):
+        return image_url.replace("www/", "local/", 1)
+    return image_url
+
+def _watch_directories(hass, directories):
+    """Return the absolute paths of the watch directories that exist and may be read (runs in the executor)."""
+    config_dir = os.path.realpath(hass.config.config_dir)
+    paths = []
+    for directory in str(directories).split(","):
+        directory = directory.strip()
+        if not directory:
+            continue
+        path = os.path.realpath(hass.config.path(directory))
+        if os.path.commonpath([path, config_dir]) != config_dir and not hass.config.is_allowed_path(path):
+            _LOGGER.warning("Not watching %s: it is outside the config dir and not in allowlist_external_dirs", directory)
+        elif not os.path.isdir(path):
+            _LOGGER.warning("Not watching %s: it is not a directory", directory)
+        else:
+            paths.append(path)
+    return paths
+
+def _ns_to_seconds(duration):
+    """Convert a duration reported by Ollama (nanoseconds) to seconds."""
+    return duration / 1e9 if duration is not None else None
+
+def _image_options(data):
+    """Return the per-call preprocessing overrides of a service call."""
+    return {
+        key: data[key]
+        for key in (ATTR_MAX_DIMENSION, ATTR_IMAGE_FORMAT, ATTR_IMAGE_QUALITY, ATTR_CROP)
+        if key in data
+    }
+
+async def _async_analyze_image(hass, entry_id_to_use, data, prepared=None, submitted=None):
+    """
+    Analyze one image and publish the result to its sensor and the event bus.
+    
+    prepared is an image already fetched by OllamaClient.async_prepare_image.
+    If data has image_urls, all of those images are sent to the model together.
+    submitted is when the call was queued, to report the time spent waiting for a slot.
+    """
+    started = time.monotonic()
+    image_urls = data.get(ATTR_IMAGE_URLS)
+    image_url = image_urls[0] if image_urls else data.get(ATTR_IMAGE_URL)
+    vision_prompt = data.get(ATTR_PROMPT, DEFAULT_PROMPT)
+    image_name = data.get(ATTR_IMAGE_NAME)
+    use_text_model = data.get(ATTR_USE_TEXT_MODEL, False)
+    text_prompt = data.get(ATTR_TEXT_PROMPT, DEFAULT_TEXT_PROMPT)
+    response_format = data.get(ATTR_FORMAT)
+    
+    # Properly slugify the image name to ensure consistent IDs
+    slugified_image_name = slugify(image_name)
+    
     client_to_use = hass.data[DOMAIN][entry_id_to_use]["client"]
     
+    # Per-call preprocessing overrides
+    image_options = _image_options(data)
+    
+    display_url = _display_url(image_url)
+    
+    # Optionally show the description on the sensor while it is being generated
+    on_token = abort_stream = None
+    if data.get(ATTR_STREAM, hass.data[DOMAIN][entry_id_to_use]["config"].get(CONF_STREAM_UPDATES)):
+        on_token, abort_stream = _make_stream_publisher(hass, entry_id_to_use, image_name, display_url, vision_prompt)
+    
     # Analyze the image using the selected client
-    vision_description = await client_to_use.analyze_image(image_url, vision_prompt)
+    details = {}
+    vision_description = None
+    try:
+        if image_urls:
+            vision_description = await client_to_use.compare_images(
+                image_urls,
+                vision_prompt,
+                details,
+                image_options=image_options,
+                on_token=on_token,
+                response_format=response_format,
+            )
+        else:
+            vision_description = await client_to_use.analyze_image(
+                image_url,
+                vision_prompt,
+                details,
+                image_name=slugified_image_name,
+                image_options=image_options,
+                on_token=on_token,
+                prepared=prepared,
+                response_format=response_format,
+            )
+    finally:
+        if vision_description is None and abort_stream is not None:
+            # Don't leave a cut-off description on the sensor
+            abort_stream()
     
     if vision_description is None:
+        if details.get("circuit_open"):
+            raise HomeAssistantError("Ollama server is unavailable")
         raise HomeAssistantError("Failed to analyze image")
     
+    # A JSON answer is parsed once here, so templates can use its fields directly
+    structured_data = parse_structured(vision_description) if response_format is not None else None
+    
     # Determine if we should use the text model for elaboration
     config = hass.data[DOMAIN][entry_id_to_use]["config"]
     text_model_enabled = config.get(CONF_TEXT_MODEL_ENABLED, False)
     
     # Only elaborate if both the service call requests it and the config has it enabled
-    final_description = vision_description
-    text_prompt_formatted = None
-    if use_text_model and text_model_enabled:
-        text_prompt_formatted = text_prompt.format(description=vision_description)
-        final_description = await client_to_use.elaborate_text(vision_description, text_prompt_formatted)
-    
-    # Replace 'www/' with 'local/' if applicable
-    # If the image is within /config/www, it will actually 
-    # be displayed in companion app notifications
-    if image_url.startswith("www/"):
-        image_url = image_url.replace("www/", "local/", 1)
-    
-    # Store data so the sensor can display it
-    pending_sensors = hass.data[DOMAIN].setdefault("pending_sensors", {}).setdefault(entry_id_to_use, {})
-    pending_sensors[image_name] = {
+    elaborate = use_text_model and text_model_enabled
+    text_prompt_formatted = text_prompt.format(description=vision_description) if elaborate else None
+    vision_done = time.monotonic()
+    image_display_urls = [_display_url(url) for url in image_urls] if image_urls else None
+    sensor_data = {
         "description": vision_description,
-        "image_url": image_url,
+        "image_url": display_url,
         "prompt": vision_prompt,
         "unique_id": f"{entry_id_to_use}_{slugified_image_name}",
-        "final_description": final_description if (use_text_model and text_model_enabled) else None,
+        "final_description": None,
         "text_prompt": text_prompt_formatted,
-        "used_text_model": use_text_model and text_model_enabled
+        "used_text_model": elaborate,
+        "cache_hit": details.get("cache_hit", False),
+        "scene_reused": details.get("scene_reused", False),
+        "scene_distance": details.get("scene_distance"),
+        "image_urls": image_display_urls,
+        "structured_data": structured_data,
     }
     
-    # Fire event for sensor creation/update
-    hass.bus.async_fire(f"{DOMAIN}_create_sensor", {
-        "entry_id": entry_id_to_use,
-        "image_name": image_name
-    })
+    async def _async_finish(run_text=True):
+        """Run the text model (unless run_text is False), then record, publish and announce the result."""
+        final_description = vision_description
+        used_text_model = elaborate and run_text
+        if used_text_model:
+            final_description = await client_to_use.elaborate_text(vision_description, text_prompt, details)
+        finished = time.monotonic()
+        vision_stats = details.get("vision_stats", {})
+        text_stats = details.get("text_stats", {})
+        
+        # Per-stage breakdown in seconds (None for stages that didn't run)
+        timings = {
+            **details.get("timings", {}),
+            # As reported by Ollama: time spent evaluating the prompt (and images)
+            "prompt_eval": _ns_to_seconds(vision_stats.get("prompt_eval_duration")),
+            "text_prompt_eval": _ns_to_seconds(text_stats.get("prompt_eval_duration")),
+            "queued": started - submitted if submitted is not None else None,
+            "vision": vision_done - started,
+            "text": finished - vision_done if used_text_model else None,
+            "total": finished - (submitted if submitted is not None else started),
+        }
+        timings = {
+            stage: round(timings[stage], 3) if timings.get(stage) is not None else None
+            for stage in STAGES
+        }
+        speed = tokens_per_second(vision_stats)
+        reused = details.get("cache_hit", False) or details.get("scene_reused", False)
+        hass.data[DOMAIN][entry_id_to_use]["metrics"].record(timings, vision_stats, reused=reused)
+        
+        # Store data so the sensor can display it
+        _async_publish_to_sensor(hass, entry_id_to_use, image_name, {
+            **sensor_data,
+            "final_description": final_description if used_text_model else None,
+            "used_text_model": used_text_model,
+        })
+        
+        # Fire user-facing event with all relevant fields
+        event_data = {
+            "integration_id": entry_id_to_use,
+            "image_name": image_name,
+            "image_url": display_url,
+            "prompt": vision_prompt,
+            "description": vision_description,
+            "used_text_model": used_text_model,
+            "text_prompt": text_prompt_formatted,
+            "final_description": final_description,
+            "cache_hit": details.get("cache_hit", False),
+            "scene_reused": details.get("scene_reused", False),
+            "scene_distance": details.get("scene_distance"),
+            "timings": timings,
+            "eval_count": vision_stats.get("eval_count"),
+            "eval_duration": vision_stats.get("eval_duration"),
+            "tokens_per_second": round(speed, 1) if speed is not None else None,
+            "prompt_eval_count": vision_stats.get("prompt_eval_count"),
+            "prompt_eval_duration": vision_stats.get("prompt_eval_duration"),
+            "text_prompt_eval_count": text_stats.get("prompt_eval_count"),
+            "text_prompt_eval_duration": text_stats.get("prompt_eval_duration"),
+        }
+        if response_format is not None:
+            event_data["structured_data"] = structured_data
+        if image_urls:
+            event_data["image_urls"] = image_display_urls
+        hass.bus.async_fire(EVENT_IMAGE_ANALYZED, event_data)
+        return event_data
     
-    # Try to update existing sensor if it exists
+    text_scheduler = hass.data[DOMAIN][entry_id_to_use]["text_scheduler"]
+    if elaborate and config.get(CONF_PIPELINE_TEXT) and text_scheduler is not None:
+        # Show the raw description now and hand the text model its own slot, so this
+        # entry's vision slot is free for the next image while the text model runs
+        _async_publish_to_sensor(hass, entry_id_to_use, image_name, {**sensor_data, "elaborating": True})
+        
+        async def _async_text_stage():
+            """Run the text stage, falling back to the vision description if it can't run."""
+            try:
+                return await text_scheduler.async_submit(slugified_image_name, _async_finish)
+            except (AnalysisDropped, asyncio.CancelledError) as exc:
+                # The vision result already exists, so a full text queue mustn't lose it.
+                # Only give up when this task itself is cancelled or the entry is unloaded.
+                if asyncio.current_task().cancelling() or entry_id_to_use not in hass.data[DOMAIN]:
+                    raise
+                _LOGGER.warning(
+                    "Skipped the text model for %s (%s), using the vision description",
+                    image_name, str(exc) or type(exc).__name__
+                )
+                return await _async_finish(run_text=False)
+        
+        return hass.async_create_task(
+            _async_text_stage(),
+            f"{DOMAIN} text stage {slugified_image_name}",
+        )
+    return await _async_finish()
+
+@callback
+def _async_publish_to_sensor(hass, entry_id, image_name, sensor_data):
+    """Store the data for an image sensor and create or update the sensor."""
+    slugified_image_name = slugify(image_name)
+    sensor_data["unique_id"] = f"{entry_id}_{slugified_image_name}"
+    hass.data[DOMAIN][entry_id]["results"].set(sensor_data["unique_id"], sensor_data)
+    
+    # Update the sensor if it exists, otherwise fire event for sensor creation
     created_sensors = hass.data[DOMAIN].setdefault("created_sensors", {})
-    sensor_unique_id = f"{entry_id_to_use}_{slugified_image_name}"
-    if sensor_unique_id in created_sensors:
-        created_sensors[sensor_unique_id].async_update_from_pending()
-    
-    # Fire user-facing event with all relevant fields
-    event_data = {
-        "integration_id": entry_id_to_use,
-        "image_name": image_name,
-        "image_url": image_url,
-        "prompt": vision_prompt,
-        "description": vision_description,
-        "used_text_model": use_text_model and text_model_enabled,
-        "text_prompt": text_prompt_formatted,
-        "final_description": final_description,
-    }
-    hass.bus.async_fire(EVENT_IMAGE_ANALYZED, event_data)
+    if sensor_data["unique_id"] in created_sensors:
+        created_sensors[sensor_data["unique_id"]].async_update_from_pending()
+    else:
+        hass.bus.async_fire(f"{DOMAIN}_create_sensor", {
+            "entry_id": entry_id,
+            "image_name": image_name
+        })
+
+def _make_stream_publisher(hass, entry_id, image_name, image_url, prompt):
+    """
+    Return callbacks (on_token, abort) to publish the partial description at a throttled rate.
+    
+    abort undoes the partial updates if the analysis fails: the sensor goes back to its
+    previous result, or, without one, keeps the partial text marked as failed.
+    """
+    parts = []
+    published = 0
+    last_publish = 0.0
+    unique_id = f"{entry_id}_{slugify(image_name)}"
+    previous = hass.data[DOMAIN][entry_id]["results"].get(unique_id)
+    
+    @callback
+    def on_token(token):
+        nonlocal published, last_publish
+        parts.append(token)
+        now = time.monotonic()
+        if now - last_publish < STREAM_UPDATE_INTERVAL:
+            return
+        last_publish = now
+        
+        partial_description = "".join(parts)
+        _async_publish_to_sensor(hass, entry_id, image_name, {
+            "description": partial_description,
+            "image_url": image_url,
+            "prompt": prompt,
+            "streaming": True,
+        })
+        hass.bus.async_fire(EVENT_STREAM_CHUNK, {
+            "integration_id": entry_id,
+            "image_name": image_name,
+            "chunk": partial_description[published:],
+            "partial_description": partial_description,
+        })
+        published = len(partial_description)
+    
+    @callback
+    def abort():
+        if not published or entry_id not in hass.data[DOMAIN]:
+            return
+        if previous is not None:
+            _async_publish_to_sensor(hass, entry_id, image_name, dict(previous))
+        else:
+            _async_publish_to_sensor(hass, entry_id, image_name, {
+                "description": "".join(parts),
+                "image_url": image_url,
+                "prompt": prompt,
+                "streaming": False,
+                "failed": True,
+            })
+    
+    return on_token, abort
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
@@ -284,13 +925,18 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         if len(valid_entries) <= 1:
             # Unregister service if this is the last instance
             hass.services.async_remove(DOMAIN, SERVICE_ANALYZE_IMAGE)
+            hass.services.async_remove(DOMAIN, SERVICE_ANALYZE_IMAGES)
+            hass.services.async_remove(DOMAIN, SERVICE_COMPARE_IMAGES)
+            hass.services.async_remove(DOMAIN, SERVICE_WARM_UP)
         
-        # Remove data for this entry
+        # Remove data for this entry and release its connection pools
         if entry.entry_id in hass.data[DOMAIN]:
-            hass.data[DOMAIN].pop(entry.entry_id)
-        
-        if entry.entry_id in hass.data[DOMAIN].get("pending_sensors", {}):
-            hass.data[DOMAIN]["pending_sensors"].pop(entry.entry_id)
+            entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+            await entry_data["scheduler"].async_shutdown()
+            if entry_data["text_scheduler"] is not None:
+                await entry_data["text_scheduler"].async_shutdown()
+            await entry_data["cache"].async_save()
+            await entry_data["client"].async_close()
         
         # Clean up created_sensors that belong to this entry
         created_sensors = hass.data[DOMAIN].get("created_sensors", {})
@@ -302,6 +948,10 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted data when a config entry is deleted."""
+    await Store(hass, CACHE_STORAGE_VERSION, cache_storage_key(entry.entry_id)).async_remove()
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
@@ -1,12 +1,43 @@
 """API client for Ollama Vision (collecting NDJSON lines)."""
+from homeassistant.components.camera import async_get_image as async_get_camera_image
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+import asyncio
 import os
 import logging
 import aiohttp
 import base64
 import json
+import random
+import time
+from collections import OrderedDict
 from urllib.parse import urlparse
 
+from .const import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_COMPARE_MAX_DIMENSION,
+    CIRCUIT_OPEN,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_FIRST_TOKEN_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_RETRIES,
+    IMAGE_FETCH_TIMEOUT,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    CONF_MAX_DIMENSION,
+    CONF_IMAGE_FORMAT,
+    CONF_IMAGE_QUALITY,
+    ATTR_CROP,
+    CAMERA_PROXY_PATH,
+    FILE_SIGNATURES_MAX,
+    SCENES_MAX,
+    CHAT_VISION_SYSTEM_MESSAGE,
+)
+from .backends import BackendError, BackendPool, CircuitOpenError, ImageSourceError, OllamaBackend
+from .imaging import difference_hash, hamming_distance, prepare_image
+from .ndjson import NDJSONDecoder, STAT_FIELDS
+from .structured import JSONCompletion
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -77,6 +108,175 @@ def _parse_url_or_host_port(url_or_host, port=None):
     return "http", url_or_host_str, int(parsed_port), ""
 
 
+def _build_api_base_urls(hosts, port=None) -> list:
+    """Return the /api base URL of every server in a comma-separated host list."""
+    urls = []
+    for item in str(hosts).split(","):
+        if not item.strip():
+            continue
+        protocol, host, parsed_port, path = _parse_url_or_host_port(item, port)
+        urls.append(f"{protocol}://{host}:{parsed_port}{path}/api")
+    return urls
+
+
+def _camera_entity_id(image_url: str):
+    """Return the camera entity of a camera proxy URL, or None for other URLs."""
+    if not image_url.startswith(CAMERA_PROXY_PATH):
+        return None
+    return image_url[len(CAMERA_PROXY_PATH):].split("?", 1)[0]
+
+
+def _is_local_file(image_url: str) -> bool:
+    """Return True if an image URL is a path below the config directory."""
+    return not image_url.startswith(("/api", "http://", "https://"))
+
+
+def _read_file(path: str, known_signature=None):
+    """
+    Stat and read a local file in one go (runs in the executor).
+
+    Returns (signature, data), where signature is (mtime_ns, size, inode). If it equals
+    known_signature the file hasn't changed and isn't read, and data is None. The file is
+    read straight into a buffer of its size, so it is copied into memory only once.
+    """
+    with open(path, "rb", buffering=0) as image_file:
+        stat = os.fstat(image_file.fileno())
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == known_signature:
+            return signature, None
+        data = bytearray(stat.st_size)
+        with memoryview(data) as view:
+            read = 0
+            while read < len(data):
+                count = image_file.readinto(view[read:])
+                if not count:
+                    break
+                read += count
+        # The file was truncated while we read it
+        del data[read:]
+        return signature, data
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Return the delay before retry number attempt (0-based): exponential backoff with full jitter."""
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempt))
+
+
+# Base64 turns every 3 input bytes into 4 output bytes, so encoded chunks must be a multiple of 3
+_B64_CHUNK_SIZE = 3 * 64 * 1024
+# Read size when streaming an image from its source
+_SOURCE_CHUNK_SIZE = 256 * 1024
+
+
+async def _iter_generate_body(payload: dict, images: list, timings: dict = None, chat: bool = False):
+    """
+    Yield a JSON request body for payload plus an "images" array, encoding images on the fly.
+
+    For /api/generate the array is added to the payload itself. For /api/chat (chat=True) it
+    is added to the last message, so "messages" must be the payload's last key.
+
+    Each image is bytes (sliced through a memoryview, without copying) or an async iterable
+    of byte chunks. Only one chunk of base64 text is alive at a time, so peak memory stays
+    a small constant instead of several full copies of the encoded image.
+    If a timings dict is given, the time spent encoding is added to timings["encode"].
+    """
+    encode_time = 0.0
+
+    def encode(data):
+        nonlocal encode_time
+        started = time.perf_counter()
+        encoded = base64.b64encode(data)
+        encode_time += time.perf_counter() - started
+        if timings is not None:
+            timings["encode"] = encode_time
+        return encoded
+
+    # json.dumps(payload) ends with "}" (or "}]}" for a chat payload), reopen it to append the images array
+    closing = b"}]}" if chat else b"}"
+    yield json.dumps(payload).encode("utf-8")[:-len(closing)] + b', "images": ["'
+    for index, image in enumerate(images):
+        if index:
+            yield b'", "'
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            view = memoryview(image)
+            for start in range(0, len(view), _B64_CHUNK_SIZE):
+                yield encode(view[start:start + _B64_CHUNK_SIZE])
+        else:
+            remainder = b""
+            async for chunk in image:
+                data = remainder + chunk if remainder else chunk
+                cut = len(data) - len(data) % 3
+                if cut:
+                    yield encode(memoryview(data)[:cut])
+                remainder = bytes(data[cut:])
+            if remainder:
+                yield encode(remainder)
+    yield b'"]' + closing
+
+
+class _ImageStream:
+    """
+    An image URL whose response is open, streamed into a request body chunk by chunk.
+
+    The source's status is checked before anything is sent to Ollama. If reading the body
+    fails halfway, the error is kept in .error, so the failure is blamed on the image source
+    instead of on the Ollama server receiving it. .started tells whether any of the body has
+    been read: until then, the request can still be sent again (e.g. to another server).
+    """
+
+    def __init__(self, response):
+        self._response = response
+        self.error = None
+        self.started = False
+
+    async def __aiter__(self):
+        self.started = True
+        try:
+            async for chunk in self._response.content.iter_chunked(_SOURCE_CHUNK_SIZE):
+                yield chunk
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            self.error = exc
+            raise
+        finally:
+            self._response.release()
+
+    def close(self):
+        """Release the source's connection (if the stream wasn't read to the end)."""
+        self._response.release()
+
+
+def _replayable(images) -> bool:
+    """Return True if a request with these images can still be sent again."""
+    return all(
+        isinstance(image, (bytes, bytearray, memoryview))
+        or (isinstance(image, _ImageStream) and not image.started)
+        for image in images or ()
+    )
+
+
+def _source_error(images):
+    """Return the error of the first streamed image that failed to read, or None."""
+    for image in images or ():
+        if isinstance(image, _ImageStream) and image.error is not None:
+            return image.error
+    return None
+
+
+class PreparedImage:
+    """An image that has been fetched and preprocessed, ready for the vision model."""
+
+    def __init__(self):
+        self.image = None  # bytes, or an async iterator over the raw image
+        self.cache_key = None
+        self.scene_hash = None
+        self.description = None  # set when the cache or scene check already has the answer
+        self.prompt_key = None  # prompt plus answer format, for the cache and scene checks
+        self.file_signature = None  # (mtime_ns, size, inode) of a local file
+        self.file_key = None  # prompt_key plus preprocessing, for the unchanged-file check (if enabled)
+        self.scene_key = None  # prompt_key plus preprocessing, for the scene check
+        self.details = {}
+
+
 class OllamaClient:
     """Ollama API client that parses NDJSON lines when stream=true."""
 
@@ -91,18 +291,49 @@ class OllamaClient:
         text_model=None,
         vision_keepalive=-1,
         text_keepalive=-1,
+        pool_size=DEFAULT_POOL_SIZE,
+        result_cache=None,
+        scene_threshold=0,
+        image_options=None,
+        update_callback=None,
+        connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+        first_token_timeout=DEFAULT_FIRST_TOKEN_TIMEOUT,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        use_chat=False,
     ):
         self.hass = hass
+        # Send prompts through /api/chat, with the fixed part as the system message
+        self.use_chat = use_chat
+        # Timeouts in seconds; 0 disables the first-token and total timeout
+        self.first_token_timeout = first_token_timeout or None
+        self.request_timeout = aiohttp.ClientTimeout(
+            total=request_timeout or None, sock_connect=connect_timeout
+        )
+        self.fetch_timeout = aiohttp.ClientTimeout(total=IMAGE_FETCH_TIMEOUT, sock_connect=connect_timeout)
+        self.retries = retries
+        self._update_callback = update_callback
+        self.pool_size = pool_size
+        self.result_cache = result_cache
+        # Perceptual hash of the last analyzed frame per image name
+        self.scene_threshold = scene_threshold
+        self._scenes = OrderedDict()
+        # Signature and description of the last analysis of each local file
+        self._files = OrderedDict()
+        # Default preprocessing (max_dimension, image_format, image_quality)
+        self.image_options = image_options or {}
+        # One OllamaBackend (and keep-alive session) per base URL, shared by vision and text
+        self._backends = {}
         self.model = model
         self.vision_keepalive = vision_keepalive
         
-        # Parse vision host/URL
-        vision_protocol, vision_host, vision_port, vision_path = _parse_url_or_host_port(host, port)
-        self.host = vision_host
-        self.port = vision_port
-        # Build API base URL with path support
-        base_path = vision_path if vision_path else ""
-        self.api_base_url = f"{vision_protocol}://{vision_host}:{vision_port}{base_path}/api"
+        # Parse vision host/URL (a comma-separated list spreads the load over several servers)
+        vision_urls = _build_api_base_urls(host, port)
+        _, self.host, self.port, _ = _parse_url_or_host_port(str(host).split(",")[0], port)
+        self.api_base_url = vision_urls[0]
+        self.vision_pool = BackendPool(
+            hass, [self._get_backend(url) for url in vision_urls], update_callback
+        )
 
         # Parse text model host/URL
         self.text_enabled = text_host is not None
@@ -112,158 +343,682 @@ class OllamaClient:
         self.text_keepalive = text_keepalive
         
         if self.text_enabled:
-            text_protocol, parsed_text_host, parsed_text_port, text_path = _parse_url_or_host_port(text_host, text_port)
-            self.text_host = parsed_text_host
-            self.text_port = parsed_text_port
-            # Build text API base URL with path support
-            text_base_path = text_path if text_path else ""
-            self.text_api_base_url = f"{text_protocol}://{parsed_text_host}:{parsed_text_port}{text_base_path}/api"
+            text_urls = _build_api_base_urls(text_host, text_port)
+            _, self.text_host, self.text_port, _ = _parse_url_or_host_port(
+                str(text_host).split(",")[0], text_port
+            )
+            self.text_api_base_url = text_urls[0]
+            self.text_pool = BackendPool(
+                hass, [self._get_backend(url) for url in text_urls], update_callback
+            )
         else:
             self.text_api_base_url = None
+            self.text_pool = None
+
+    def _get_backend(self, api_base_url: str) -> OllamaBackend:
+        """Return the backend for an Ollama base URL, creating it on first use."""
+        backend = self._backends.get(api_base_url)
+        if backend is None:
+            backend = OllamaBackend(api_base_url, self.pool_size)
+            self._backends[api_base_url] = backend
+        return backend
 
-    async def analyze_image(self, image_url: str, prompt: str) -> str:
+    async def async_open(self):
+        """Create the pooled HTTP sessions and start health probing."""
+        for backend in self._backends.values():
+            backend.ensure_session()
+        for pool in (self.vision_pool, self.text_pool):
+            if pool is not None:
+                pool.async_start()
+
+    async def async_close(self):
+        """Stop health probing and close the pooled HTTP sessions."""
+        for pool in (self.vision_pool, self.text_pool):
+            if pool is not None:
+                pool.async_stop()
+        for backend in self._backends.values():
+            await backend.async_close()
+
+    async def async_warm_up(self, only_missing: bool = False):
         """
-        Send an image analysis request to Ollama in streaming (NDJSON) mode.
-        Concatenate the .response fields into one final string, or return None on error.
+        Load the vision (and text) model on every server ahead of the first analysis.
+
+        An empty prompt makes Ollama load the model and keep it for keep_alive without
+        generating anything. With only_missing, servers whose last /api/ps poll shows the
+        model as loaded are skipped.
         """
+        jobs = [(self.vision_pool, self.model, self.vision_keepalive)]
+        if self.text_enabled:
+            jobs.append((self.text_pool, self.text_model, self.text_keepalive))
+
+        await asyncio.gather(*(
+            self._async_warm_up_backend(backend, model, keepalive)
+            for pool, model, keepalive in jobs
+            for backend in pool.backends
+            if backend.available and not (only_missing and backend.is_loaded(model) is not False)
+        ))
+        await self.async_update_residency()
+
+    async def _async_warm_up_backend(self, backend: OllamaBackend, model: str, keepalive):
+        """Send an empty-prompt generate request to load a model on one server."""
+        payload = {"model": model, "prompt": "", "stream": False, "keep_alive": keepalive}
+        started = time.monotonic()
         try:
-            # 1) Get image data
-            # a) Directly from an internal API
-            if image_url.startswith("/api"):
-                full_url = f"{self.hass.config.internal_url.rstrip('/')}{image_url}"
-                session = async_get_clientsession(self.hass)
+            async with backend.session.post(
+                f"{backend.api_base_url}/generate", json=payload, timeout=self.request_timeout
+            ) as response:
+                if response.status != 200:
+                    _LOGGER.warning(
+                        "Could not warm up %s on %s: %s", model, backend.api_base_url, await response.text()
+                    )
+                    return
+                await response.read()
+            _LOGGER.debug(
+                "Warmed up %s on %s in %.1fs", model, backend.api_base_url, time.monotonic() - started
+            )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            _LOGGER.warning("Could not warm up %s on %s: %s", model, backend.api_base_url, str(exc) or type(exc).__name__)
 
-                async with session.get(full_url) as resp:
-                    if resp.status != 200:
-                        _LOGGER.error("Failed to fetch image from URL: %s", full_url)
-                        return None
-                    image_data = await resp.read()
+    async def async_update_residency(self):
+        """Poll /api/ps on every server to see which models are loaded."""
+        for backend in self._backends.values():
+            if backend.state == CIRCUIT_OPEN:
+                backend.loaded_models = None
+                continue
+            try:
+                async with backend.session.get(
+                    f"{backend.api_base_url}/ps", timeout=self.fetch_timeout
+                ) as response:
+                    if response.status != 200:
+                        backend.loaded_models = None
+                        continue
+                    data = await response.json()
+                backend.loaded_models = {
+                    model.get("name"): model.get("expires_at") for model in data.get("models", [])
+                }
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+                _LOGGER.debug("Could not poll loaded models on %s: %s", backend.api_base_url, str(exc) or type(exc).__name__)
+                backend.loaded_models = None
+        if self._update_callback is not None:
+            self._update_callback()
 
-            # b) External URL
-            elif image_url.startswith("http://") or image_url.startswith("https://"):
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(image_url) as resp:
-                            if resp.status != 200:
-                                _LOGGER.error(
-                                    "Failed to fetch external image (Status: %s, URL: %s)", 
-                                    resp.status, 
-                                    image_url
-                                )
-                                return None
-                            
-                            try:
-                                image_data = await resp.read()
-                            except Exception as read_exc:
-                                _LOGGER.error(
-                                    "Error reading image data from external URL (URL: %s): %s", 
-                                    image_url, 
-                                    str(read_exc)
-                                )
-                                return None
+    async def _async_fetch_image(self, image_url: str, size: int = None):
+        """
+        Read a whole image from a camera, an internal API, an external URL or a local file, or return None.
 
-                except aiohttp.ClientError as client_exc:
-                    _LOGGER.error(
-                        "Client error fetching external image (URL: %s): %s", 
-                        image_url, 
-                        str(client_exc)
-                    )
-                    return None
-                except Exception as fetch_exc:
-                    _LOGGER.error(
-                        "Unexpected error fetching external image (URL: %s): %s", 
-                        image_url, 
-                        str(fetch_exc)
-                    )
+        size asks a camera for a frame of at least that many pixels on each side, where it can scale.
+        """
+        try:
+            # a) Camera snapshot, taken in-process instead of through Home Assistant's web server
+            camera_entity_id = _camera_entity_id(image_url)
+            if camera_entity_id is not None:
+                image_data = await self._async_read_camera(camera_entity_id, size)
+                if image_data is None:
                     return None
 
-            # c) Local File
-            else:
-                try:
-                    full_path = self.hass.config.path(image_url)
-                    
-                    # Check file existence in executor
-                    file_exists = await self.hass.async_add_executor_job(
-                        os.path.isfile, full_path
-                    )
-                    if not file_exists:
-                        _LOGGER.error("Local image file not found: %s", image_url)
-                        return None
+            # b) Directly from an internal API
+            elif image_url.startswith("/api"):
+                full_url = f"{self.hass.config.internal_url.rstrip('/')}{image_url}"
+                image_data = await self._async_read_url(full_url)
+                if image_data is None:
+                    return None
 
-                    # Read file contents in executor
-                    try:
-                        image_data = await self.hass.async_add_executor_job(
-                            lambda: open(full_path, "rb").read()
-                        )
-                    except IOError as io_exc:
-                        _LOGGER.error(
-                            "IO Error reading local image file (Path: %s): %s", 
-                            full_path, 
-                            str(io_exc)
-                        )
-                        return None
+            # c) External URL
+            elif image_url.startswith("http://") or image_url.startswith("https://"):
+                image_data = await self._async_read_url(image_url)
+                if image_data is None:
+                    return None
 
-                except Exception as local_exc:
-                    _LOGGER.error(
-                        "Unexpected error accessing local image file (Path: %s): %s", 
-                        image_url, 
-                        str(local_exc)
-                    )
+            # d) Local File
+            else:
+                _, image_data = await self._async_read_file(image_url)
+                if image_data is None:
                     return None
 
             # Validate image data
             if not image_data:
                 _LOGGER.error("No image data retrieved for URL: %s", image_url)
                 return None
+            return image_data
 
-            # 2) Convert to Base64
-            try:
-                image_base64 = base64.b64encode(image_data).decode("utf-8")
-            except Exception as base64_exc:
-                _LOGGER.error(
-                    "Error encoding image to base64 (URL: %s): %s", 
-                    image_url, 
-                    str(base64_exc)
-                )
-                return None
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.error("Unexpected error fetching image (URL: %s): %s", image_url, str(exc) or type(exc).__name__)
+            return None
 
-            # 3) Build request payload with stream=true
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "images": [image_base64],
-                "stream": True,
-                "keep_alive": self.vision_keepalive
-            }
+    async def _async_read_camera(self, entity_id: str, size: int = None):
+        """
+        Return a snapshot of a camera entity, or None on error.
 
-            _LOGGER.debug("Vision model: %s", self.model)
-            _LOGGER.debug("Vision API: %s", self.api_base_url)
-            _LOGGER.debug("Vision prompt: %s", prompt)
-
-            # 4) Make the POST request and parse NDJSON lines
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.api_base_url}/generate"
-                async with session.post(url, json=payload) as gen_response:
-                    if gen_response.status != 200:
-                        text = await gen_response.text()
-                        _LOGGER.error("Failed response from Ollama: %s", text)
+        With a size, the camera component scales JPEG snapshots down (without fully decoding
+        them) to the smallest size that is at least size pixels on each side, so a
+        full-resolution frame isn't passed around only to be downscaled afterwards.
+        """
+        try:
+            image = await async_get_camera_image(
+                self.hass, entity_id, timeout=IMAGE_FETCH_TIMEOUT, width=size, height=size
+            )
+        except HomeAssistantError as exc:
+            _LOGGER.error("Failed to get a snapshot from %s: %s", entity_id, exc)
+            return None
+        return image.content
+
+    async def _async_read_file(self, image_url: str, known_signature=None):
+        """
+        Read a local file in one executor job, see _read_file.
+
+        Returns (signature, data), or (None, None) if the file can't be read.
+        """
+        full_path = self.hass.config.path(image_url)
+        try:
+            return await self.hass.async_add_executor_job(
+                _read_file, full_path, known_signature
+            )
+        except FileNotFoundError:
+            _LOGGER.error("Local image file not found: %s", image_url)
+        except (OSError, ValueError) as exc:
+            _LOGGER.error("IO Error reading local image file (Path: %s): %s", full_path, exc)
+        return None, None
+
+    async def _async_read_url(self, url: str):
+        """
+        Return the body of an image URL, or None on error.
+
+        Connection errors, timeouts and 5xx answers are retried with backoff. Home Assistant's
+        shared session keeps connections alive between fetches.
+        """
+        session = async_get_clientsession(self.hass)
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(url, timeout=self.fetch_timeout) as resp:
+                    if resp.status == 200:
+                        return await resp.read()
+                    if resp.status < 500 or attempt == self.retries:
+                        _LOGGER.error("Failed to fetch image (Status: %s, URL: %s)", resp.status, url)
                         return None
+                    reason = f"HTTP {resp.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                if attempt == self.retries:
+                    _LOGGER.error("Error fetching image (URL: %s): %s", url, str(exc) or type(exc).__name__)
+                    return None
+                reason = str(exc) or type(exc).__name__
+            delay = _backoff_delay(attempt)
+            _LOGGER.debug("Fetching %s failed (%s), retrying in %.1fs", url, reason, delay)
+            await asyncio.sleep(delay)
+        return None
 
-                    final_text = await self._collect_ndjson(gen_response)
-                    return final_text
+    async def analyze_image(
+        self,
+        image_url: str,
+        prompt: str,
+        details: dict = None,
+        image_name: str = None,
+        image_options: dict = None,
+        on_token=None,
+        prepared: "PreparedImage" = None,
+        response_format=None,
+    ) -> str:
+        """
+        Send an image analysis request to Ollama in streaming (NDJSON) mode.
+        Concatenate the .response fields into one final string, or return None on error.
+
+        If a details dict is given, it is filled with metadata about the run (e.g. cache_hit).
+        If image_name is given and the scene threshold is set, a frame that looks like the last
+        analyzed frame for that name reuses the previous description.
+        image_options overrides the client's preprocessing defaults for this call.
+        on_token is called with each partial text while the vision model generates.
+        prepared is the result of an earlier async_prepare_image call for this image; the
+        image is then not fetched again.
+        response_format is passed to Ollama as "format" ("json" or a JSON schema).
+        """
+        if details is None:
+            details = {}
+        details["cache_hit"] = False
+        details["scene_reused"] = False
 
+        try:
+            # 1) Get image data, streaming it straight into the request when nothing needs the bytes
+            if prepared is None:
+                prepared = await self.async_prepare_image(
+                    image_url, prompt, image_name, image_options, response_format=response_format
+                )
+                if prepared is None:
+                    return None
+            details.update(prepared.details)
+
+            # Cached or unchanged scene: reuse the earlier description
+            if prepared.description is not None:
+                return prepared.description
+
+            # 2) Send the image to the vision model
+            try:
+                final_text = await self._async_generate_vision(
+                    prompt,
+                    [prepared.image],
+                    stats=details.setdefault("vision_stats", {}),
+                    on_token=on_token,
+                    timings=details.setdefault("timings", {}),
+                    response_format=response_format,
+                )
+            finally:
+                if isinstance(prepared.image, _ImageStream):
+                    prepared.image.close()
+            if prepared.cache_key is not None and final_text:
+                self.result_cache.set(prepared.cache_key, final_text)
+            if prepared.file_key is not None and final_text:
+                self._files[image_url] = {
+                    "signature": prepared.file_signature,
+                    "key": prepared.file_key,
+                    "description": final_text,
+                    "expires": time.time() + self.result_cache.ttl,
+                }
+                self._files.move_to_end(image_url)
+                while len(self._files) > FILE_SIGNATURES_MAX:
+                    self._files.popitem(last=False)
+            if prepared.scene_hash is not None and final_text:
+                self._scenes[image_name] = {
+                    "hash": prepared.scene_hash,
+                    "key": prepared.scene_key,
+                    "description": final_text,
+                }
+                self._scenes.move_to_end(image_name)
+                while len(self._scenes) > SCENES_MAX:
+                    self._scenes.popitem(last=False)
+            return final_text
+
+        except CircuitOpenError as exc:
+            # Known outage: fail fast without flooding the log
+            _LOGGER.debug("Skipping image analysis (URL: %s): %s", image_url, exc)
+            details["circuit_open"] = True
+            return None
+        except ImageSourceError as exc:
+            _LOGGER.error("Error reading image (URL: %s): %s", image_url, exc)
+            return None
         except Exception as exc:
-            _LOGGER.error("Comprehensive error in image analysis (URL: %s): %s", image_url, exc)
+            _LOGGER.error("Comprehensive error in image analysis (URL: %s): %s", image_url, str(exc) or type(exc).__name__)
+            return None
+
+    async def compare_images(
+        self,
+        image_urls: list,
+        prompt: str,
+        details: dict = None,
+        image_options: dict = None,
+        on_token=None,
+        response_format=None,
+    ) -> str:
+        """
+        Send several images to the vision model in one request with a shared prompt.
+
+        The model runs once over all frames, e.g. to describe what changed across a burst.
+        Every image is downscaled (to DEFAULT_COMPARE_MAX_DIMENSION unless max_dimension is
+        set) so the request stays small. The result cache and scene check don't apply.
+        """
+        if details is None:
+            details = {}
+        details["cache_hit"] = False
+        details["scene_reused"] = False
+
+        options = {**self.image_options, **(image_options or {})}
+        max_dimension = options.get(CONF_MAX_DIMENSION) or DEFAULT_COMPARE_MAX_DIMENSION
+
+        try:
+            if not self.vision_pool.available:
+                raise CircuitOpenError("Ollama server unavailable")
+
+            # 1) Fetch all images at once, then downscale them in the executor
+            timings = details.setdefault("timings", {})
+            started = time.monotonic()
+            images = await asyncio.gather(*(self._async_fetch_image(url, max_dimension) for url in image_urls))
+            if any(image_data is None for image_data in images):
+                return None
+            details["image_bytes"] = sum(len(image_data) for image_data in images)
+            timings["fetch"] = time.monotonic() - started
+
+            prepared = await asyncio.gather(*(
+                self.hass.async_add_executor_job(
+                    prepare_image,
+                    image_data,
+                    max_dimension,
+                    options.get(CONF_IMAGE_FORMAT, "jpeg"),
+                    options.get(CONF_IMAGE_QUALITY, 85),
+                )
+                for image_data in images
+            ))
+            images = [image_data for image_data, _ in prepared]
+            details["upload_bytes"] = sum(len(image_data) for image_data in images)
+            timings["preprocess"] = time.monotonic() - started - timings["fetch"]
+
+            # 2) Send all images to the vision model in one request
+            return await self._async_generate_vision(
+                prompt,
+                images,
+                stats=details.setdefault("vision_stats", {}),
+                on_token=on_token,
+                timings=timings,
+                response_format=response_format,
+            )
+
+        except CircuitOpenError as exc:
+            _LOGGER.debug("Skipping multi-image analysis (URLs: %s): %s", image_urls, exc)
+            details["circuit_open"] = True
             return None
+        except Exception as exc:  # pylint: disable=broad-except
+            _LOGGER.error("Error in multi-image analysis (URLs: %s): %s", image_urls, str(exc) or type(exc).__name__)
+            return None
+
+    async def async_prepare_image(
+        self,
+        image_url: str,
+        prompt: str,
+        image_name: str = None,
+        image_options: dict = None,
+        buffer: bool = False,
+        response_format=None,
+    ):
+        """
+        Do all the work for an analysis that doesn't need the vision model.
+
+        Fetches the image, looks it up in the result cache, downscales/crops it and checks
+        the scene hash. Returns a PreparedImage, or None if the image can't be read.
+        Unless buffer is True, a URL that needs none of that is only opened as a stream.
+        A local file that hasn't changed since it was last analyzed the same way isn't read
+        again; the previous description is reused.
+        """
+        options = {**self.image_options, **(image_options or {})}
+        max_dimension = options.get(CONF_MAX_DIMENSION) or 0
+        crop = options.get(ATTR_CROP)
+        preprocess = bool(max_dimension or crop)
+        want_hash = self.scene_threshold > 0 and bool(image_name)
+        use_cache = self.result_cache is not None and self.result_cache.enabled
+        prepared = PreparedImage()
+        timings = prepared.details["timings"] = {}
+        # A JSON answer is not interchangeable with a free-text one for the same prompt
+        prepared.prompt_key = prompt
+        if response_format is not None:
+            prepared.prompt_key += json.dumps(response_format, sort_keys=True)
+
+        variant = f"{max_dimension}:{crop}" if preprocess else ""
+
+        started = time.monotonic()
+        if _is_local_file(image_url):
+            # Stat and read in one job; an unchanged file (same mtime, size and inode) isn't read.
+            # Like the result cache, this is off when the cache is disabled and expires with its TTL.
+            previous = None
+            if use_cache:
+                prepared.file_key = prepared.prompt_key + variant
+                previous = self._files.get(image_url)
+                if previous and (previous["key"] != prepared.file_key or previous["expires"] < time.time()):
+                    previous = None
+            known_signature = previous["signature"] if previous else None
+            prepared.file_signature, image_data = await self._async_read_file(image_url, known_signature)
+            if prepared.file_signature is None:
+                return None
+            timings["fetch"] = time.monotonic() - started
+            if image_data is None:
+                _LOGGER.debug("Image file unchanged, reusing description: %s", image_url)
+                prepared.details["cache_hit"] = True
+                prepared.details["file_unchanged"] = True
+                prepared.description = previous["description"]
+                return prepared
+            if not image_data:
+                _LOGGER.error("No image data retrieved for URL: %s", image_url)
+                return None
+            if not (preprocess or want_hash or use_cache):
+                prepared.image = image_data
+                return prepared
+        elif not (preprocess or want_hash or use_cache or buffer):
+            prepared.image = await self._async_open_image_stream(image_url)
+            return prepared if prepared.image is not None else None
+        else:
+            # Without a crop, a camera may already scale the frame close to max_dimension
+            image_data = await self._async_fetch_image(image_url, None if crop else max_dimension or None)
+            if image_data is None:
+                return None
+            timings["fetch"] = time.monotonic() - started
+        started = time.monotonic()
+
+        # Identical image, model, prompt and preprocessing: reuse the cached description
+        if use_cache:
+            prepared.cache_key = await self.hass.async_add_executor_job(
+                self.result_cache.make_key, image_data, self.model, prepared.prompt_key + variant
+            )
+            cached = self.result_cache.get(prepared.cache_key)
+            if cached is not None:
+                _LOGGER.debug("Result cache hit for image: %s", image_url)
+                prepared.details["cache_hit"] = True
+                prepared.description = cached
+                timings["preprocess"] = time.monotonic() - started
+                return prepared
+
+        # Downscale/crop/re-encode and hash in one executor job, so the image is decoded once
+        prepared.details["image_bytes"] = len(image_data)
+        try:
+            if preprocess:
+                image_data, prepared.scene_hash = await self.hass.async_add_executor_job(
+                    prepare_image,
+                    image_data,
+                    max_dimension,
+                    options.get(CONF_IMAGE_FORMAT, "jpeg"),
+                    options.get(CONF_IMAGE_QUALITY, 85),
+                    crop,
+                    want_hash,
+                )
+            elif want_hash:
+                prepared.scene_hash = await self.hass.async_add_executor_job(difference_hash, image_data)
+        except Exception as image_exc:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                "Could not preprocess image, sending it as-is (URL: %s): %s", image_url, image_exc
+            )
+        prepared.details["upload_bytes"] = len(image_data)
+        prepared.image = image_data
+        timings["preprocess"] = time.monotonic() - started
+
+        # Scene unchanged since the last analyzed frame: reuse its description
+        if prepared.scene_hash is not None:
+            # Only frames preprocessed the same way (e.g. the same crop) are comparable
+            prepared.scene_key = prepared.prompt_key + variant
+            previous = self._scenes.get(image_name)
+            if previous and previous["key"] == prepared.scene_key:
+                distance = hamming_distance(prepared.scene_hash, previous["hash"])
+                prepared.details["scene_distance"] = distance
+                if distance < self.scene_threshold:
+                    _LOGGER.debug(
+                        "Scene unchanged for %s (distance %s), reusing description", image_name, distance
+                    )
+                    prepared.details["scene_reused"] = True
+                    prepared.description = previous["description"]
+        return prepared
+
+    async def _async_generate_vision(
+        self,
+        prompt: str,
+        images: list,
+        stats: dict = None,
+        on_token=None,
+        timings: dict = None,
+        response_format=None,
+    ):
+        """
+        POST a streaming /api/generate request for the vision model and collect the answer.
+
+        With use_chat, /api/chat is used instead, with a fixed system message that Ollama
+        can reuse from the previous call. The prompt stays in the user message with the
+        images, so models whose template ignores the system message still get the question.
+
+        images are bytes or async iterables of raw image chunks. They are base64-encoded
+        chunk by chunk while the request body is written, so the encoded image is never
+        held in memory as a whole. stats, on_token and timings are passed on to _async_generate.
+
+        With a response_format, Ollama constrains the answer to JSON (matching the schema, if
+        one is given) and the request is stopped as soon as the JSON value is complete.
+        """
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "keep_alive": self.vision_keepalive
+        }
+        if self.use_chat:
+            # "messages" goes last: the images are appended to the last message
+            payload["messages"] = [
+                {"role": "system", "content": CHAT_VISION_SYSTEM_MESSAGE},
+                {"role": "user", "content": prompt},
+            ]
+        else:
+            payload["prompt"] = prompt
+        stop = None
+        if response_format is not None:
+            # Put "format" first, "messages" has to stay the last key
+            payload = {"format": response_format, **payload}
+            stop = JSONCompletion().feed
+
+        _LOGGER.debug("Vision model: %s", self.model)
+        _LOGGER.debug("Vision prompt: %s", prompt)
+
+        final_text = await self._async_generate(
+            self.vision_pool, payload, images=images, stats=stats, on_token=on_token, timings=timings, stop=stop
+        )
+        _LOGGER.debug("Vision stats: %s", stats)
+        return final_text
+
+    async def _async_generate(
+        self,
+        pool: BackendPool,
+        payload: dict,
+        images: list = None,
+        stats: dict = None,
+        on_token=None,
+        timings: dict = None,
+        stop=None,
+    ):
+        """
+        POST a streaming /api/generate request to the least-loaded server of a pool.
+
+        Payloads with "messages" are posted to /api/chat instead.
+
+        If a timings dict is given, it receives the seconds spent base64-encoding images
+        ("encode"), until the first bytes of the answer ("first_token") and from there
+        until the answer was complete ("generation"). stop is passed on to _collect_ndjson.
+
+        If a server can't be reached, answers with a server error, reports an error in the
+        stream or doesn't produce a first token in time, the request is retried with backoff,
+        on another server if there is one. Once text of the answer has been passed on it is
+        not retried. Streamed image sources can only be read once, so once the request has
+        started reading one it is not retried either; a connection that fails before that
+        (e.g. a server that is down) is still retried.
+        """
+        attempts = max(self.retries, len(pool) - 1) + 1
+
+        if timings is None:
+            timings = {}
+        chat = "messages" in payload
+
+        for attempt in range(attempts):
+            streaming = False
+            started = time.monotonic()
+            try:
+                async with pool.acquire() as backend, asyncio.timeout(self.first_token_timeout) as deadline:
+
+                    def _on_first_chunk():
+                        deadline.reschedule(None)
+                        timings["first_token"] = time.monotonic() - started
 
+                    def _on_token(partial):
+                        nonlocal streaming
+                        streaming = True
+                        if on_token is not None:
+                            on_token(partial)
 
+                    _LOGGER.debug("Ollama API: %s", backend.api_base_url)
+                    url = f"{backend.api_base_url}/{'chat' if chat else 'generate'}"
+                    if images is None:
+                        request = backend.session.post(url, json=payload, timeout=self.request_timeout)
+                    else:
+                        request = backend.session.post(
+                            url,
+                            data=_iter_generate_body(payload, images, timings, chat=chat),
+                            headers={"Content-Type": "application/json"},
+                            timeout=self.request_timeout,
+                        )
+                    try:
+                        async with request as gen_response:
+                            if gen_response.status >= 500:
+                                text = await gen_response.text()
+                                raise BackendError(f"HTTP {gen_response.status}: {text}")
+                            if gen_response.status != 200:
+                                text = await gen_response.text()
+                                _LOGGER.error("Failed response from Ollama: %s", text)
+                                return None
+
+                            final_text = await self._collect_ndjson(
+                                gen_response,
+                                on_token=_on_token,
+                                stats=stats,
+                                on_first_chunk=_on_first_chunk,
+                                stop=stop,
+                            )
+                            if "first_token" in timings:
+                                timings["generation"] = time.monotonic() - started - timings["first_token"]
+                            return final_text
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                        # aiohttp reports a failing body as a connection error of the request
+                        source_error = _source_error(images)
+                        if source_error is not None:
+                            raise ImageSourceError(
+                                str(source_error) or type(source_error).__name__
+                            ) from exc
+                        raise
+            except CircuitOpenError:
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError, BackendError) as exc:
+                if streaming or attempt == attempts - 1 or not _replayable(images):
+                    raise
+                delay = _backoff_delay(attempt)
+                _LOGGER.warning(
+                    "Ollama server %s failed (%s), retrying in %.1fs",
+                    backend.api_base_url, str(exc) or type(exc).__name__, delay
+                )
+                await asyncio.sleep(delay)
+        return None
 
+    async def _async_open_image_stream(self, image_url: str):
+        """
+        Return an iterable over the raw bytes of an image URL, or None if it can't be read.
+
+        The source is opened and its status checked here, so a dead camera never gets as far
+        as a request to Ollama. Nothing is buffered: chunks are read from the source as the
+        request body is written. Camera snapshots are returned as bytes, since the camera
+        hands them over in one piece.
+        """
+        camera_entity_id = _camera_entity_id(image_url)
+        if camera_entity_id is not None:
+            return await self._async_read_camera(camera_entity_id)
+        if image_url.startswith("/api"):
+            image_url = f"{self.hass.config.internal_url.rstrip('/')}{image_url}"
+        session = async_get_clientsession(self.hass)
+        try:
+            response = await session.get(image_url, timeout=self.fetch_timeout)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            _LOGGER.error("Error fetching image (URL: %s): %s", image_url, str(exc) or type(exc).__name__)
+            return None
+        if response.status != 200:
+            _LOGGER.error("Failed to fetch image (Status: %s, URL: %s)", response.status, image_url)
+            response.release()
+            return None
+        return _ImageStream(response)
 
-    async def elaborate_text(self, text: str, prompt_template: str) -> str:
+    async def elaborate_text(self, text: str, prompt_template: str, details: dict = None) -> str:
         """
         Same NDJSON approach for text elaboration, if the user has a text model.
         Concatenate partial tokens from .response
+
+        If a details dict is given, the text model's statistics are stored in details["text_stats"].
+
+        With use_chat, the part of the template before {description} is sent as the system
+        message and the rest, with the description, as the user message. The instructions
+        then form a fixed prefix that Ollama only evaluates once while the model stays loaded.
         """
+        if details is None:
+            details = {}
         if not self.text_enabled:
             # fallback
             return text
@@ -274,57 +1029,95 @@ class OllamaClient:
 
             payload = {
                 "model": self.text_model,
-                "prompt": prompt,
                 "stream": True,
                 "keep_alive": self.text_keepalive
             }
+            if self.use_chat:
+                instructions, placeholder, rest = prompt_template.partition("{description}")
+                if not placeholder:
+                    instructions, rest = prompt_template, text
+                else:
+                    rest = text + rest.replace("{description}", text)
+                payload["messages"] = [
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": rest},
+                ]
+            else:
+                payload["prompt"] = prompt
 
             _LOGGER.debug("Text model: %s", self.text_model)
-            _LOGGER.debug("Text API: %s", self.text_api_base_url)
             _LOGGER.debug("Text prompt: %s", prompt)
 
-            async with aiohttp.ClientSession() as session:
-                url = f"{self.text_api_base_url}/generate"
-                async with session.post(url, json=payload) as gen_response:
-                    if gen_response.status != 200:
-                        err = await gen_response.text()
-                        _LOGGER.error("Failed response from text Ollama: %s", err)
-                        return text
-
-                    final_text = await self._collect_ndjson(gen_response)
-                    return final_text or text
+            final_text = await self._async_generate(
+                self.text_pool, payload, stats=details.setdefault("text_stats", {})
+            )
+            _LOGGER.debug("Text stats: %s", details["text_stats"])
+            return final_text or text
 
+        except CircuitOpenError as exc:
+            _LOGGER.debug("Skipping text elaboration: %s", exc)
+            return text
         except Exception as exc:  # pylint: disable=broad-except
-            _LOGGER.error("Error elaborating text: %s", exc)
+            _LOGGER.error("Error elaborating text: %s", str(exc) or type(exc).__name__)
             return text
 
-    async def _collect_ndjson(self, response: aiohttp.ClientResponse) -> str:
+    async def _collect_ndjson(
+        self,
+        response: aiohttp.ClientResponse,
+        on_token=None,
+        stats: dict = None,
+        on_first_chunk=None,
+        stop=None,
+    ) -> str:
         """
         Collect NDJSON lines of the form:
             {"response":" The", "done":false}
         and keep appending .response to a list.
         Stop if 'done': true or if no more lines.
         Return the concatenated text.
+
+        on_token is called with each partial text as it arrives. If a stats dict is
+        given, it receives the timing and token counts from the final 'done' object.
+        on_first_chunk is called once, when the first bytes of the answer arrive.
+        stop is called with each partial text; once it returns True, the answer is returned
+        without reading the rest of the stream, and closing the response makes Ollama stop.
+        Raises BackendError if Ollama reports an error in the stream.
         """
+        decoder = NDJSONDecoder()
         collected_parts = []
-        async for raw_line in response.content:
-            line = raw_line.decode("utf-8").rstrip("\n")
-            if not line.strip():
-                continue  # skip empty lines
 
-            # Each line is a full JSON object
-            try:
-                data_obj = json.loads(line)
-            except json.JSONDecodeError:
-                _LOGGER.warning("NDJSON parse error on line: %r", line)
-                continue
+        def handle(data_obj) -> bool:
+            """Process one object and return True once the stream is done."""
+            if "error" in data_obj:
+                # E.g. the model ran out of memory: fail instead of returning a partial answer
+                raise BackendError(f"Error from Ollama stream: {data_obj['error']}")
 
-            # Extract the partial text
-            partial = data_obj.get("response", "")
-            collected_parts.append(partial)
+            # Extract the partial text (/api/chat streams it as message.content)
+            partial = data_obj.get("response") or data_obj.get("message", {}).get("content", "")
+            if partial:
+                collected_parts.append(partial)
+                if on_token is not None:
+                    on_token(partial)
+                if stop is not None and stop(partial):
+                    if stats is not None:
+                        stats["stopped_early"] = True
+                    return True
 
-            # If done == true, we can break
             if data_obj.get("done") is True:
-                break
+                if stats is not None:
+                    stats.update({key: data_obj[key] for key in STAT_FIELDS if key in data_obj})
+                return True
+            return False
+
+        async for chunk in response.content.iter_any():
+            if on_first_chunk is not None:
+                on_first_chunk()
+                on_first_chunk = None
+            for data_obj in decoder.feed(chunk):
+                if handle(data_obj):
+                    return "".join(collected_parts)
+
+        for data_obj in decoder.flush():
+            handle(data_obj)
 
-        return "".join(collected_parts)
\ No newline at end of file
+        return "".join(collected_parts)
@@ -0,0 +1,258 @@
+"""Ollama server pool with least-loaded routing, failover and per-server circuit breakers."""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+import aiohttp
+
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    POOL_KEEPALIVE_TIMEOUT,
+    CIRCUIT_CLOSED,
+    CIRCUIT_OPEN,
+    CIRCUIT_HALF_OPEN,
+    BACKEND_FAILURE_THRESHOLD,
+    BACKEND_PROBE_INTERVAL,
+    BACKEND_LATENCY_ALPHA,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BackendError(Exception):
+    """Raised when an Ollama server answers with a server error."""
+
+
+class CircuitOpenError(BackendError):
+    """Raised without contacting any server when every server of a pool is known to be down."""
+
+
+class ImageSourceError(Exception):
+    """Raised when an image streamed into a request fails, which is not the server's fault."""
+
+
+class OllamaBackend:
+    """One Ollama server, its keep-alive connection pool and its circuit breaker."""
+
+    def __init__(self, api_base_url, pool_size):
+        self.api_base_url = api_base_url
+        self.pool_size = pool_size
+        self._session = None
+        self.in_flight = 0
+        self.latency = None  # EWMA of request durations, in seconds
+        self.failures = 0
+        self.state = CIRCUIT_CLOSED
+        self.opened_at = None
+        self.trial_in_flight = False
+        # Models loaded on the server ({name: expires_at}) per the last /api/ps poll, None if unknown
+        self.loaded_models = None
+
+    @property
+    def available(self) -> bool:
+        """Return True if the breaker lets a request through."""
+        if self.state == CIRCUIT_HALF_OPEN:
+            return not self.trial_in_flight
+        return self.state == CIRCUIT_CLOSED
+
+    def is_loaded(self, model) -> bool:
+        """Return whether a model is loaded on this server, or None if unknown."""
+        if self.loaded_models is None:
+            return None
+        # "llava" is reported as "llava:latest"
+        return model in self.loaded_models or (
+            ":" not in model and f"{model}:latest" in self.loaded_models
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the keep-alive session for this server, creating it on first use."""
+        return self.ensure_session()
+
+    def ensure_session(self) -> aiohttp.ClientSession:
+        """Create the connection pool and session unless they are already open, and return the session."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=POOL_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def async_close(self):
+        """Close the connection pool."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def as_dict(self) -> dict:
+        """Return the server state for diagnostics."""
+        return {
+            "url": self.api_base_url,
+            "circuit": self.state,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000) if self.latency is not None else None,
+            "failures": self.failures,
+            "open_for": round(time.monotonic() - self.opened_at) if self.opened_at is not None else None,
+            "loaded_models": sorted(self.loaded_models) if self.loaded_models is not None else None,
+        }
+
+
+class BackendPool:
+    """
+    Route requests for one role (vision or text) across one or more Ollama servers.
+
+    Requests go to the available server with the fewest requests in flight, ties broken by
+    the fewest recent failures and then the lowest observed latency (EWMA). Each server has a circuit breaker: after
+    BACKEND_FAILURE_THRESHOLD consecutive failures it opens and requests skip the server
+    without trying to connect. Open servers are probed via /api/version in the background;
+    once one answers, the breaker is half-open and lets a single trial request through,
+    which closes it again on success or reopens it on failure.
+    """
+
+    def __init__(self, hass, backends, update_callback=None):
+        self.hass = hass
+        self.backends = backends
+        self._update_callback = update_callback
+        self._unsub_probe = None
+
+    def __len__(self):
+        return len(self.backends)
+
+    @property
+    def available(self) -> bool:
+        """Return True if any server would take a request."""
+        return any(backend.available for backend in self.backends)
+
+    @property
+    def state(self) -> str:
+        """Return the best breaker state of all servers."""
+        states = {backend.state for backend in self.backends}
+        for state in (CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN):
+            if state in states:
+                return state
+        return CIRCUIT_OPEN
+
+    def loaded(self, model) -> bool:
+        """Return whether any server has a model loaded, or None if no server reported."""
+        states = [backend.is_loaded(model) for backend in self.backends]
+        if any(states):
+            return True
+        return False if any(state is not None for state in states) else None
+
+    def async_start(self):
+        """Start probing open servers in the background."""
+        if self._unsub_probe is None:
+            self._unsub_probe = async_track_time_interval(
+                self.hass, self._async_probe, timedelta(seconds=BACKEND_PROBE_INTERVAL)
+            )
+
+    def async_stop(self):
+        """Stop probing."""
+        if self._unsub_probe is not None:
+            self._unsub_probe()
+            self._unsub_probe = None
+
+    def select(self) -> OllamaBackend:
+        """Return the server that should take the next request."""
+        candidates = [backend for backend in self.backends if backend.available]
+        if not candidates:
+            raise CircuitOpenError(
+                "Ollama server unavailable: "
+                + ", ".join(backend.api_base_url for backend in self.backends)
+            )
+        return min(
+            candidates,
+            key=lambda backend: (
+                backend.in_flight,
+                backend.failures,
+                backend.latency if backend.latency is not None else 0.0,
+            ),
+        )
+
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        Pick a server for one request and record how the request went.
+
+        Raises CircuitOpenError if every server's breaker is open. An ImageSourceError
+        counts neither for nor against the server.
+        """
+        backend = self.select()
+        trial = backend.state == CIRCUIT_HALF_OPEN
+        if trial:
+            backend.trial_in_flight = True
+        backend.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield backend
+        except ImageSourceError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, BackendError):
+            self.record_failure(backend)
+            raise
+        else:
+            self.record_success(backend, time.monotonic() - started)
+        finally:
+            backend.in_flight -= 1
+            if trial:
+                backend.trial_in_flight = False
+
+    def record_success(self, backend, elapsed):
+        """Update the latency average, reset the failure count and close the breaker."""
+        if backend.latency is None:
+            backend.latency = elapsed
+        else:
+            backend.latency += BACKEND_LATENCY_ALPHA * (elapsed - backend.latency)
+        backend.failures = 0
+        if backend.state != CIRCUIT_CLOSED:
+            backend.state = CIRCUIT_CLOSED
+            backend.opened_at = None
+            _LOGGER.info("Ollama server %s is back", backend.api_base_url)
+        self._notify()
+
+    def record_failure(self, backend):
+        """Count a failure and open the breaker once the server keeps failing."""
+        backend.failures += 1
+        if backend.state == CIRCUIT_HALF_OPEN:
+            self._open(backend)
+            _LOGGER.debug("Ollama server %s failed its trial request", backend.api_base_url)
+        elif backend.state == CIRCUIT_CLOSED and backend.failures >= BACKEND_FAILURE_THRESHOLD:
+            self._open(backend)
+            _LOGGER.warning(
+                "Ollama server %s failed %s times in a row, skipping it until it answers again",
+                backend.api_base_url, backend.failures
+            )
+        self._notify()
+
+    @staticmethod
+    def _open(backend):
+        """Open a server's breaker."""
+        backend.state = CIRCUIT_OPEN
+        if backend.opened_at is None:
+            backend.opened_at = time.monotonic()
+
+    async def _async_probe(self, now=None):
+        """Check whether servers with an open breaker are reachable again."""
+        for backend in self.backends:
+            if backend.state != CIRCUIT_OPEN:
+                continue
+            try:
+                async with backend.session.get(
+                    f"{backend.api_base_url}/version", timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
+                    if response.status == 200:
+                        backend.state = CIRCUIT_HALF_OPEN
+                        _LOGGER.debug("Ollama server %s answers again, allowing a trial request", backend.api_base_url)
+                        self._notify()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                _LOGGER.debug("Ollama server %s is still down: %s", backend.api_base_url, str(exc) or type(exc).__name__)
+
+    def _notify(self):
+        """Tell listeners that the server state changed."""
+        if self._update_callback is not None:
+            self._update_callback()
@@ -0,0 +1,116 @@
+"""Result cache for Ollama Vision descriptions."""
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, CACHE_STORAGE_VERSION, CACHE_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def cache_storage_key(entry_id: str) -> str:
+    """Return the storage key used to persist an entry's cache."""
+    return f"{DOMAIN}.cache_{entry_id}"
+
+
+class ResultCache:
+    """
+    LRU cache of vision descriptions keyed on image content hash, model and prompt.
+
+    Entries expire after ttl seconds and the least recently used entry is evicted
+    once max_entries is reached. When persisted, the cache is saved to .storage
+    and reloaded on startup.
+    """
+
+    def __init__(self, hass, entry_id, max_entries, ttl, persist=False, update_callback=None):
+        self.hass = hass
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._update_callback = update_callback
+        self._entries = OrderedDict()
+        self._store = Store(hass, CACHE_STORAGE_VERSION, cache_storage_key(entry_id)) if persist else None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Return True if the cache holds any entries at all."""
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(image_data, model: str, prompt: str) -> str:
+        """Hash the image bytes together with the model and prompt."""
+        digest = hashlib.sha256(image_data)
+        digest.update(b"\0" + model.encode("utf-8") + b"\0" + prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Return the cached description for a key, or None on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.time():
+            # Expired
+            del self._entries[key]
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            self._notify()
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self._notify()
+        return entry[1]
+
+    def set(self, key: str, description: str):
+        """Store a description, evicting the least recently used entries if needed."""
+        if not self.enabled:
+            return
+        self._entries[key] = (time.time() + self.ttl, description)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        if self._store is not None:
+            self._store.async_delay_save(self._data_to_save, CACHE_SAVE_DELAY)
+        self._notify()
+
+    async def async_load(self):
+        """Load persisted entries, skipping expired ones."""
+        if self._store is None:
+            return
+        data = await self._store.async_load()
+        if not data:
+            return
+        now = time.time()
+        for key, expires_at, description in data.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (expires_at, description)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        _LOGGER.debug("Loaded %s cached descriptions", len(self._entries))
+
+    async def async_save(self):
+        """Write the cache to disk right away."""
+        if self._store is not None:
+            await self._store.async_save(self._data_to_save())
+
+    def _data_to_save(self):
+        """Return the cache contents in storage format (oldest first)."""
+        return {
+            "entries": [
+                [key, expires_at, description]
+                for key, (expires_at, description) in self._entries.items()
+            ]
+        }
+
+    def _notify(self):
+        """Tell listeners that the cache statistics changed."""
+        if self._update_callback is not None:
+            self._update_callback()
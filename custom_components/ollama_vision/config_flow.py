@@ -24,6 +24,54 @@ from .const import (
     CONF_VISION_KEEPALIVE,
     DEFAULT_KEEPALIVE,
     CONF_TEXT_KEEPALIVE,
+    CONF_POOL_SIZE,
+    DEFAULT_POOL_SIZE,
+    CONF_CONNECT_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+    CONF_FIRST_TOKEN_TIMEOUT,
+    DEFAULT_FIRST_TOKEN_TIMEOUT,
+    CONF_REQUEST_TIMEOUT,
+    DEFAULT_REQUEST_TIMEOUT,
+    CONF_RETRIES,
+    DEFAULT_RETRIES,
+    CONF_WARMUP,
+    DEFAULT_WARMUP,
+    CONF_PIPELINE_TEXT,
+    DEFAULT_PIPELINE_TEXT,
+    CONF_CHAT_API,
+    DEFAULT_CHAT_API,
+    CONF_WATCH_DIRECTORIES,
+    DEFAULT_WATCH_DIRECTORIES,
+    CONF_WATCH_PATTERNS,
+    DEFAULT_WATCH_PATTERNS,
+    CONF_WATCH_DEBOUNCE,
+    DEFAULT_WATCH_DEBOUNCE,
+    CONF_MAX_CONCURRENT,
+    DEFAULT_MAX_CONCURRENT,
+    CONF_QUEUE_SIZE,
+    DEFAULT_QUEUE_SIZE,
+    CONF_OVERFLOW_POLICY,
+    DEFAULT_OVERFLOW_POLICY,
+    OVERFLOW_POLICIES,
+    CONF_COALESCE,
+    DEFAULT_COALESCE,
+    CONF_CACHE_SIZE,
+    DEFAULT_CACHE_SIZE,
+    CONF_CACHE_TTL,
+    DEFAULT_CACHE_TTL,
+    CONF_CACHE_PERSIST,
+    DEFAULT_CACHE_PERSIST,
+    CONF_SCENE_THRESHOLD,
+    DEFAULT_SCENE_THRESHOLD,
+    CONF_MAX_DIMENSION,
+    DEFAULT_MAX_DIMENSION,
+    CONF_IMAGE_FORMAT,
+    DEFAULT_IMAGE_FORMAT,
+    IMAGE_FORMATS,
+    CONF_IMAGE_QUALITY,
+    DEFAULT_IMAGE_QUALITY,
+    CONF_STREAM_UPDATES,
+    DEFAULT_STREAM_UPDATES,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -113,6 +161,18 @@ def _build_api_url(host, port=None, endpoint="version"):
     return f"{protocol}://{parsed_host}:{parsed_port}{base_path}/api/{endpoint}"
 
 
+async def _async_can_connect(hosts) -> bool:
+    """Return True if every server in a comma-separated host list answers /api/version."""
+    async with aiohttp.ClientSession() as session:
+        for host in str(hosts).split(","):
+            if not host.strip():
+                continue
+            async with session.get(_build_api_url(host.strip(), None, "version")) as response:
+                if response.status != 200:
+                    return False
+    return True
+
+
 class OllamaVisionConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Ollama Vision."""
 
@@ -130,23 +190,18 @@ class OllamaVisionConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             # Test connection to Ollama vision server
             try:
-                session = aiohttp.ClientSession()
-                api_url = _build_api_url(user_input[CONF_HOST], None, "version")
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        await session.close()
-                        # Store vision config and proceed
-                        self.vision_config = user_input
-                        # If text model is enabled, go to text model config step
-                        if user_input.get(CONF_TEXT_MODEL_ENABLED):
-                            return await self.async_step_text_model()
-                        # Otherwise create entry with just vision config
-                        return self.async_create_entry(
-                            title=user_input[CONF_NAME],
-                            data=user_input,
-                        )
-                    errors["base"] = "cannot_connect"
-                await session.close()
+                if await _async_can_connect(user_input[CONF_HOST]):
+                    # Store vision config and proceed
+                    self.vision_config = user_input
+                    # If text model is enabled, go to text model config step
+                    if user_input.get(CONF_TEXT_MODEL_ENABLED):
+                        return await self.async_step_text_model()
+                    # Otherwise create entry with just vision config
+                    return self.async_create_entry(
+                        title=user_input[CONF_NAME],
+                        data=user_input,
+                    )
+                errors["base"] = "cannot_connect"
             except aiohttp.ClientError:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
@@ -173,19 +228,14 @@ class OllamaVisionConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             # Test connection to text model Ollama server
             try:
-                session = aiohttp.ClientSession()
-                api_url = _build_api_url(user_input[CONF_TEXT_HOST], None, "version")
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        await session.close()
-                        # Merge vision and text configs
-                        combined_config = {**self.vision_config, **user_input}
-                        return self.async_create_entry(
-                            title=self.vision_config[CONF_NAME],
-                            data=combined_config,
-                        )
-                    errors["base"] = "cannot_connect"
-                await session.close()
+                if await _async_can_connect(user_input[CONF_TEXT_HOST]):
+                    # Merge vision and text configs
+                    combined_config = {**self.vision_config, **user_input}
+                    return self.async_create_entry(
+                        title=self.vision_config[CONF_NAME],
+                        data=combined_config,
+                    )
+                errors["base"] = "cannot_connect"
             except aiohttp.ClientError:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
@@ -224,18 +274,13 @@ class OllamaVisionOptionsFlow(config_entries.OptionsFlow):
         errors = {}
         if user_input is not None:
             try:
-                session = aiohttp.ClientSession()
-                api_url = _build_api_url(user_input[CONF_HOST], None, "version")
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        await session.close()
-                        self.vision_options = user_input
-                        if user_input.get(CONF_TEXT_MODEL_ENABLED):
-                            # If text model is enabled, proceed to second step.
-                            return await self.async_step_text_model_options()
-                        return self.async_create_entry(title="", data=user_input)
-                    errors["base"] = "cannot_connect"
-                await session.close()
+                if await _async_can_connect(user_input[CONF_HOST]):
+                    self.vision_options = user_input
+                    if user_input.get(CONF_TEXT_MODEL_ENABLED):
+                        # If text model is enabled, proceed to second step.
+                        return await self.async_step_text_model_options()
+                    return await self.async_step_performance_options()
+                errors["base"] = "cannot_connect"
             except aiohttp.ClientError:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
@@ -281,16 +326,11 @@ class OllamaVisionOptionsFlow(config_entries.OptionsFlow):
         errors = {}
         if user_input is not None:
             try:
-                session = aiohttp.ClientSession()
-                api_url = _build_api_url(user_input[CONF_TEXT_HOST], None, "version")
-                async with session.get(api_url) as response:
-                    if response.status == 200:
-                        await session.close()
-                        # Merge the vision options and the text model options into one entry.
-                        combined_options = {**self.vision_options, **user_input}
-                        return self.async_create_entry(title="", data=combined_options)
-                    errors["base"] = "cannot_connect"
-                await session.close()
+                if await _async_can_connect(user_input[CONF_TEXT_HOST]):
+                    # Merge the vision options and the text model options, then tune performance.
+                    self.vision_options = {**self.vision_options, **user_input}
+                    return await self.async_step_performance_options()
+                errors["base"] = "cannot_connect"
             except aiohttp.ClientError:
                 errors["base"] = "cannot_connect"
             except Exception:  # pylint: disable=broad-except
@@ -326,3 +366,111 @@ class OllamaVisionOptionsFlow(config_entries.OptionsFlow):
             data_schema=schema,
             errors=errors,
         )
+
+    async def async_step_performance_options(self, user_input=None):
+        """Handle the last step: connection and performance tuning."""
+        if user_input is not None:
+            # Merge all collected options into one entry.
+            combined_options = {**self.vision_options, **user_input}
+            return self.async_create_entry(title="", data=combined_options)
+
+        options = self._config_entry.options
+
+        schema = vol.Schema({
+            vol.Required(
+                CONF_POOL_SIZE,
+                default=options.get(CONF_POOL_SIZE, DEFAULT_POOL_SIZE),
+            ): vol.All(int, vol.Range(min=1, max=100)),
+            vol.Required(
+                CONF_CONNECT_TIMEOUT,
+                default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+            ): vol.All(int, vol.Range(min=1, max=300)),
+            vol.Required(
+                CONF_FIRST_TOKEN_TIMEOUT,
+                default=options.get(CONF_FIRST_TOKEN_TIMEOUT, DEFAULT_FIRST_TOKEN_TIMEOUT),
+            ): vol.All(int, vol.Range(min=0, max=3600)),
+            vol.Required(
+                CONF_REQUEST_TIMEOUT,
+                default=options.get(CONF_REQUEST_TIMEOUT, DEFAULT_REQUEST_TIMEOUT),
+            ): vol.All(int, vol.Range(min=0, max=3600)),
+            vol.Required(
+                CONF_RETRIES,
+                default=options.get(CONF_RETRIES, DEFAULT_RETRIES),
+            ): vol.All(int, vol.Range(min=0, max=10)),
+            vol.Required(
+                CONF_MAX_CONCURRENT,
+                default=options.get(CONF_MAX_CONCURRENT, DEFAULT_MAX_CONCURRENT),
+            ): vol.All(int, vol.Range(min=1, max=32)),
+            vol.Required(
+                CONF_QUEUE_SIZE,
+                default=options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+            ): vol.All(int, vol.Range(min=0, max=1000)),
+            vol.Required(
+                CONF_OVERFLOW_POLICY,
+                default=options.get(CONF_OVERFLOW_POLICY, DEFAULT_OVERFLOW_POLICY),
+            ): vol.In(OVERFLOW_POLICIES),
+            vol.Optional(
+                CONF_COALESCE,
+                default=options.get(CONF_COALESCE, DEFAULT_COALESCE),
+            ): bool,
+            vol.Required(
+                CONF_CACHE_SIZE,
+                default=options.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE),
+            ): vol.All(int, vol.Range(min=0, max=10000)),
+            vol.Required(
+                CONF_CACHE_TTL,
+                default=options.get(CONF_CACHE_TTL, DEFAULT_CACHE_TTL),
+            ): vol.All(int, vol.Range(min=1)),
+            vol.Optional(
+                CONF_CACHE_PERSIST,
+                default=options.get(CONF_CACHE_PERSIST, DEFAULT_CACHE_PERSIST),
+            ): bool,
+            vol.Required(
+                CONF_SCENE_THRESHOLD,
+                default=options.get(CONF_SCENE_THRESHOLD, DEFAULT_SCENE_THRESHOLD),
+            ): vol.All(int, vol.Range(min=0, max=64)),
+            vol.Required(
+                CONF_MAX_DIMENSION,
+                default=options.get(CONF_MAX_DIMENSION, DEFAULT_MAX_DIMENSION),
+            ): vol.All(int, vol.Range(min=0, max=8192)),
+            vol.Required(
+                CONF_IMAGE_FORMAT,
+                default=options.get(CONF_IMAGE_FORMAT, DEFAULT_IMAGE_FORMAT),
+            ): vol.In(IMAGE_FORMATS),
+            vol.Required(
+                CONF_IMAGE_QUALITY,
+                default=options.get(CONF_IMAGE_QUALITY, DEFAULT_IMAGE_QUALITY),
+            ): vol.All(int, vol.Range(min=1, max=100)),
+            vol.Optional(
+                CONF_STREAM_UPDATES,
+                default=options.get(CONF_STREAM_UPDATES, DEFAULT_STREAM_UPDATES),
+            ): bool,
+            vol.Optional(
+                CONF_WARMUP,
+                default=options.get(CONF_WARMUP, DEFAULT_WARMUP),
+            ): bool,
+            vol.Optional(
+                CONF_PIPELINE_TEXT,
+                default=options.get(CONF_PIPELINE_TEXT, DEFAULT_PIPELINE_TEXT),
+            ): bool,
+            vol.Optional(
+                CONF_CHAT_API,
+                default=options.get(CONF_CHAT_API, DEFAULT_CHAT_API),
+            ): bool,
+            vol.Optional(
+                CONF_WATCH_DIRECTORIES,
+                default=options.get(CONF_WATCH_DIRECTORIES, DEFAULT_WATCH_DIRECTORIES),
+            ): str,
+            vol.Optional(
+                CONF_WATCH_PATTERNS,
+                default=options.get(CONF_WATCH_PATTERNS, DEFAULT_WATCH_PATTERNS),
+            ): str,
+            vol.Optional(
+                CONF_WATCH_DEBOUNCE,
+                default=options.get(CONF_WATCH_DEBOUNCE, DEFAULT_WATCH_DEBOUNCE),
+            ): vol.All(int, vol.Range(min=0, max=300)),
+        })
+        return self.async_show_form(
+            step_id="performance_options",
+            data_schema=schema,
+        )
@@ -21,9 +21,23 @@ ATTR_IMAGE_URL = "image_url"
 ATTR_PROMPT = "prompt"
 ATTR_IMAGE_NAME = "image_name"
 ATTR_DEVICE_ID = "device_id"
+# Camera snapshots are taken in-process for camera_entity and camera proxy URLs
+ATTR_CAMERA_ENTITY = "camera_entity"
+CAMERA_PROXY_PATH = "/api/camera_proxy/"
+SERVICE_ANALYZE_IMAGES = "analyze_images"
+ATTR_IMAGES = "images"
+# Images a batch fetches and preprocesses ahead of the ones being analyzed
+BATCH_PREFETCH = 2
+SERVICE_COMPARE_IMAGES = "compare_images"
+ATTR_IMAGE_URLS = "image_urls"
+DEFAULT_COMPARE_PROMPT = "Compare these images, taken in order. What changed between them?"
+MAX_COMPARE_IMAGES = 8
+# Frames sent together are always downscaled to at least this size to keep the request bounded
+DEFAULT_COMPARE_MAX_DIMENSION = 768
 
 # Event constants
 EVENT_IMAGE_ANALYZED = "ollama_vision_image_analyzed"
+EVENT_STREAM_CHUNK = "ollama_vision_stream_chunk"
 
 # Textual model (optional)
 CONF_TEXT_MODEL_ENABLED = "text_model_enabled"
@@ -38,3 +52,123 @@ DEFAULT_TEXT_PROMPT = "You are an AI that describes people outside of my home. G
 # Textual model service call constants
 ATTR_USE_TEXT_MODEL = "use_text_model"
 ATTR_TEXT_PROMPT = "text_prompt"
+
+# Connection pooling (one keep-alive pool per Ollama server)
+CONF_POOL_SIZE = "pool_size"
+DEFAULT_POOL_SIZE = 10
+POOL_KEEPALIVE_TIMEOUT = 60
+
+# Analysis scheduling (per config entry)
+CONF_MAX_CONCURRENT = "max_concurrent"
+DEFAULT_MAX_CONCURRENT = 2
+CONF_QUEUE_SIZE = "queue_size"
+DEFAULT_QUEUE_SIZE = 10
+CONF_OVERFLOW_POLICY = "overflow_policy"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_POLICIES = [OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_COALESCE]
+DEFAULT_OVERFLOW_POLICY = OVERFLOW_DROP_OLDEST
+CONF_COALESCE = "coalesce_per_image"
+DEFAULT_COALESCE = False
+
+# Dispatcher signal sent when an entry's runtime statistics change, at most once per interval (seconds)
+SIGNAL_STATS_UPDATED = f"{DOMAIN}_stats_updated_{{}}"
+STATS_UPDATE_INTERVAL = 1
+
+# Result cache keyed on image content, model and prompt
+CONF_CACHE_SIZE = "cache_size"
+DEFAULT_CACHE_SIZE = 100
+CONF_CACHE_TTL = "cache_ttl"
+DEFAULT_CACHE_TTL = 600
+CONF_CACHE_PERSIST = "cache_persist"
+DEFAULT_CACHE_PERSIST = False
+CACHE_STORAGE_VERSION = 1
+CACHE_SAVE_DELAY = 30
+
+# Latest results waiting for their image sensor (per entry)
+RESULT_STORE_MAX_ENTRIES = 500
+RESULT_STORE_TTL = 3600
+
+# The (mtime, size, inode) of recently analyzed local files, so an unchanged file is
+# neither read nor analyzed again while the result cache is enabled
+FILE_SIGNATURES_MAX = 256
+
+# Watch directories (comma-separated, relative to the config dir) and analyze the images
+# written to them once they have settled
+CONF_WATCH_DIRECTORIES = "watch_directories"
+DEFAULT_WATCH_DIRECTORIES = ""
+CONF_WATCH_PATTERNS = "watch_patterns"
+DEFAULT_WATCH_PATTERNS = "*.jpg, *.jpeg, *.png, *.webp"
+CONF_WATCH_DEBOUNCE = "watch_debounce"
+DEFAULT_WATCH_DEBOUNCE = 2
+WATCH_SETTLE_INTERVAL = 1
+WATCH_POLL_INTERVAL = 5
+
+# Perceptual-hash "scene unchanged" detection (0 disables), remembering the last frame
+# of this many image names
+CONF_SCENE_THRESHOLD = "scene_threshold"
+DEFAULT_SCENE_THRESHOLD = 0
+SCENES_MAX = 256
+
+# Client-side image preprocessing (overridable per service call)
+CONF_MAX_DIMENSION = "max_dimension"
+DEFAULT_MAX_DIMENSION = 0
+CONF_IMAGE_FORMAT = "image_format"
+IMAGE_FORMATS = ["jpeg", "webp"]
+DEFAULT_IMAGE_FORMAT = "jpeg"
+CONF_IMAGE_QUALITY = "image_quality"
+DEFAULT_IMAGE_QUALITY = 85
+ATTR_MAX_DIMENSION = CONF_MAX_DIMENSION
+ATTR_IMAGE_FORMAT = CONF_IMAGE_FORMAT
+ATTR_IMAGE_QUALITY = CONF_IMAGE_QUALITY
+ATTR_CROP = "crop"
+# Ask for a JSON answer ("json" or a JSON schema, passed to Ollama as "format")
+ATTR_FORMAT = "format"
+
+# Live updates of the image sensor while the description is generated
+CONF_STREAM_UPDATES = "stream_updates"
+DEFAULT_STREAM_UPDATES = False
+ATTR_STREAM = "stream"
+STREAM_UPDATE_INTERVAL = 0.25
+
+# Run the text model in its own slots, after the raw description has been published
+CONF_PIPELINE_TEXT = "pipeline_text"
+DEFAULT_PIPELINE_TEXT = False
+
+# Use /api/chat with the fixed part of each prompt as the system message, so Ollama can
+# reuse the evaluated prompt across calls. The vision question stays in the user message,
+# since some vision models (moondream among them) ignore system messages.
+CONF_CHAT_API = "use_chat_api"
+DEFAULT_CHAT_API = False
+CHAT_VISION_SYSTEM_MESSAGE = "You are a vision assistant. Answer the user's question about the images they send."
+
+# Timeouts (seconds) and retries for Ollama requests and image fetches
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+DEFAULT_CONNECT_TIMEOUT = 10
+CONF_FIRST_TOKEN_TIMEOUT = "first_token_timeout"
+DEFAULT_FIRST_TOKEN_TIMEOUT = 120
+CONF_REQUEST_TIMEOUT = "request_timeout"
+DEFAULT_REQUEST_TIMEOUT = 300
+CONF_RETRIES = "retries"
+DEFAULT_RETRIES = 2
+IMAGE_FETCH_TIMEOUT = 30
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 30.0
+
+# Rolling latency/throughput statistics over the last analyses
+METRICS_WINDOW = 100
+
+# Model warm-up and residency (/api/ps) polling
+CONF_WARMUP = "warm_up"
+DEFAULT_WARMUP = False
+SERVICE_WARM_UP = "warm_up"
+RESIDENCY_POLL_INTERVAL = 60
+
+# Multiple Ollama servers per role (comma-separated hosts), each behind a circuit breaker
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+BACKEND_FAILURE_THRESHOLD = 3
+BACKEND_PROBE_INTERVAL = 30
+BACKEND_LATENCY_ALPHA = 0.3
@@ -0,0 +1,95 @@
+"""Image helpers for Ollama Vision."""
+import io
+
+from PIL import ExifTags, Image, ImageOps
+
+# dHash of hash_size x hash_size bits
+HASH_SIZE = 8
+
+# Pillow encoder names for the supported upload formats
+_FORMATS = {"jpeg": "JPEG", "webp": "WEBP"}
+
+
+def _difference_hash(image, hash_size: int = HASH_SIZE) -> int:
+    """Return the dHash of a decoded image."""
+    pixels = list(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).getdata()
+    )
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def difference_hash(image_data: bytes, hash_size: int = HASH_SIZE) -> int:
+    """
+    Return the difference hash (dHash) of an encoded image as an integer.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and each
+    bit records whether a pixel is brighter than its right-hand neighbour. Sensor noise
+    and small overlays such as timestamps barely change the hash.
+    This decodes the image and must run in the executor.
+    """
+    with Image.open(io.BytesIO(image_data)) as image:
+        image.draft("L", (hash_size * 4, hash_size * 4))  # Fast JPEG downscale on decode
+        return _difference_hash(image, hash_size)
+
+
+def prepare_image(
+    image_data: bytes,
+    max_dimension: int = 0,
+    image_format: str = "jpeg",
+    quality: int = 85,
+    crop=None,
+    compute_hash: bool = False,
+):
+    """
+    Fix the EXIF orientation, crop, downscale and re-encode an image for upload.
+
+    crop is an optional (left, top, right, bottom) box in pixels. Images larger than
+    max_dimension on their longest side are shrunk to fit (0 keeps the size).
+    Returns (image_bytes, dhash). The original bytes are returned untouched if nothing
+    had to change, and dhash is None unless compute_hash is set.
+    This decodes the image and must run in the executor.
+    """
+    with Image.open(io.BytesIO(image_data)) as image:
+        full_size = image.size
+        if max_dimension and not crop:
+            # Let the JPEG decoder skip detail we are about to throw away
+            image.draft("RGB", (max_dimension, max_dimension))
+        changed = image.size != full_size
+
+        if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+            changed = True
+
+        if crop:
+            left, top, right, bottom = (int(value) for value in crop)
+            image = image.crop(
+                (max(left, 0), max(top, 0), min(right, image.width), min(bottom, image.height))
+            )
+            changed = True
+
+        if max_dimension and max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            changed = True
+
+        dhash = _difference_hash(image) if compute_hash else None
+
+        if not changed:
+            return image_data, dhash
+
+        encoder = _FORMATS.get(image_format, "JPEG")
+        if encoder == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=encoder, quality=quality)
+        return buffer.getvalue(), dhash
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Return the number of differing bits between two hashes."""
+    return (hash_a ^ hash_b).bit_count()
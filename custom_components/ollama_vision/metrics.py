@@ -0,0 +1,95 @@
+"""Rolling latency and throughput statistics for analyses."""
+import math
+from collections import deque
+
+from .const import METRICS_WINDOW
+
+# Stages reported in the per-analysis timing breakdown, in pipeline order
+STAGES = [
+    "fetch", "preprocess", "queued", "encode", "first_token", "prompt_eval", "generation", "vision",
+    "text_prompt_eval", "text", "total",
+]
+
+
+def tokens_per_second(vision_stats: dict):
+    """Return the generation speed reported by Ollama, or None if it didn't report one."""
+    eval_count = vision_stats.get("eval_count")
+    eval_duration = vision_stats.get("eval_duration")  # nanoseconds
+    if not eval_count or not eval_duration:
+        return None
+    return eval_count / (eval_duration / 1e9)
+
+
+def _percentile(values, percent):
+    """Return the nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class AnalysisMetrics:
+    """
+    Keep the timings of the last METRICS_WINDOW analyses that ran the vision model.
+
+    Analyses answered from the result cache or by scene reuse are only counted, so
+    they don't drag the latency percentiles down.
+    """
+
+    def __init__(self, window=METRICS_WINDOW, update_callback=None):
+        self.window = window
+        self._update_callback = update_callback
+        self._total = deque(maxlen=window)
+        self._first_token = deque(maxlen=window)
+        self._tokens_per_second = deque(maxlen=window)
+        self._stages = {stage: deque(maxlen=window) for stage in STAGES}
+        self.analyses = 0
+        self.reused = 0
+
+    def record(self, timings: dict, vision_stats: dict, reused: bool = False):
+        """Record one finished analysis."""
+        self.analyses += 1
+        if reused:
+            self.reused += 1
+        else:
+            if timings.get("total") is not None:
+                self._total.append(timings["total"])
+            if timings.get("first_token") is not None:
+                self._first_token.append(timings["first_token"])
+            speed = tokens_per_second(vision_stats)
+            if speed is not None:
+                self._tokens_per_second.append(speed)
+            for stage, values in self._stages.items():
+                if timings.get(stage) is not None:
+                    values.append(timings[stage])
+        if self._update_callback is not None:
+            self._update_callback()
+
+    def latency(self, percent):
+        """Return a percentile of the total analysis time in seconds."""
+        return _percentile(self._total, percent)
+
+    def first_token(self, percent):
+        """Return a percentile of the time to first token in seconds."""
+        return _percentile(self._first_token, percent)
+
+    @property
+    def tokens_per_second(self):
+        """Return the average generation speed over the window."""
+        if not self._tokens_per_second:
+            return None
+        return sum(self._tokens_per_second) / len(self._tokens_per_second)
+
+    @property
+    def samples(self) -> int:
+        """Return the number of analyses the percentiles are based on."""
+        return len(self._total)
+
+    def stage_averages(self) -> dict:
+        """Return the average time of each stage in seconds."""
+        return {
+            stage: round(sum(values) / len(values), 3)
+            for stage, values in self._stages.items()
+            if values
+        }
@@ -0,0 +1,73 @@
+"""Incremental NDJSON decoder for Ollama streaming responses."""
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # orjson ships with Home Assistant, but fall back to the stdlib if missing
+    orjson = None
+
+_LOGGER = logging.getLogger(__name__)
+
+if orjson is not None:
+    _loads = orjson.loads
+else:
+    _loads = json.loads
+
+# Timing and token statistics reported in the final ("done": true) object
+STAT_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+class NDJSONDecoder:
+    """
+    Decode newline-delimited JSON objects from raw byte chunks.
+
+    Chunks may end in the middle of a line or contain several lines; incomplete
+    lines are buffered until the rest arrives. Lines are parsed straight from bytes,
+    with orjson when it is available.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> list:
+        """Add a chunk and return the objects of all lines it completed."""
+        self._buffer += chunk
+        objects = []
+        start = 0
+        while (end := self._buffer.find(b"\n", start)) != -1:
+            obj = self._decode(bytes(self._buffer[start:end]))
+            if obj is not None:
+                objects.append(obj)
+            start = end + 1
+        del self._buffer[:start]
+        return objects
+
+    def flush(self) -> list:
+        """Return the object on a final line that had no trailing newline, if any."""
+        line = bytes(self._buffer)
+        self._buffer.clear()
+        obj = self._decode(line)
+        return [obj] if obj is not None else []
+
+    @staticmethod
+    def _decode(line: bytes):
+        """Parse one line, skipping blank and malformed ones."""
+        if not line.strip():
+            return None
+        try:
+            obj = _loads(line)
+        except ValueError:
+            _LOGGER.warning("NDJSON parse error on line: %r", line)
+            return None
+        if not isinstance(obj, dict):
+            _LOGGER.warning("Unexpected NDJSON value: %r", line)
+            return None
+        return obj
@@ -0,0 +1,47 @@
+"""Latest analysis results of a config entry, waiting to be shown by its image sensors."""
+import time
+from collections import OrderedDict
+
+from .const import RESULT_STORE_MAX_ENTRIES, RESULT_STORE_TTL
+
+
+class ResultStore:
+    """
+    Latest sensor data per image sensor, keyed on the sensor's unique_id.
+
+    A result is stored before its sensor exists (image sensors are created on the first
+    result for an image name) and read by the sensor in constant time. Entries expire after
+    ttl seconds, the least recently updated entry is evicted once max_entries is reached,
+    and an entry is dropped when its sensor is removed. The sensors keep showing their last
+    result themselves, so memory stays bounded however many image names are used.
+    """
+
+    def __init__(self, max_entries=RESULT_STORE_MAX_ENTRIES, ttl=RESULT_STORE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, unique_id: str):
+        """Return the latest sensor data for a sensor, or None if there is none."""
+        entry = self._entries.get(unique_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            # Expired
+            del self._entries[unique_id]
+            return None
+        return entry[1]
+
+    def set(self, unique_id: str, sensor_data: dict):
+        """Store the latest sensor data for a sensor, evicting the oldest entries if needed."""
+        self._entries[unique_id] = (time.monotonic() + self.ttl, sensor_data)
+        self._entries.move_to_end(unique_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def remove(self, unique_id: str):
+        """Drop the data of a sensor that was removed."""
+        self._entries.pop(unique_id, None)
@@ -0,0 +1,213 @@
+"""Bounded concurrency scheduler for Ollama Vision analyses."""
+import asyncio
+import logging
+from collections import deque
+
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import (
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_COALESCE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AnalysisDropped(HomeAssistantError):
+    """Raised to callers whose analysis was dropped by the overflow policy."""
+
+
+class _Job:
+    """A queued analysis and the callers waiting for its result."""
+
+    def __init__(self, key, job_factory, future):
+        self.key = key
+        self.job_factory = job_factory
+        self.futures = [future]
+
+
+class AnalysisScheduler:
+    """
+    Admit at most max_in_flight analyses at once and queue the rest.
+
+    The wait queue is bounded by queue_size. When it is full, the overflow policy decides:
+    - drop_oldest: the oldest queued analysis is dropped to make room
+    - drop_newest: the new analysis is rejected
+    - coalesce: the new analysis replaces a queued one with the same key (image name),
+      otherwise the oldest queued analysis is dropped
+
+    With coalesce=True the scheduler is latest-wins per key at all times: at most one
+    analysis per key runs and at most one waits behind it. Newer calls replace the waiting
+    one, and every replaced caller receives the result of the analysis that superseded it.
+    """
+
+    def __init__(self, hass, max_in_flight, queue_size, overflow_policy, coalesce=False, update_callback=None):
+        self.hass = hass
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.coalesce = coalesce
+        self._update_callback = update_callback
+        self._queue = deque()
+        self._in_flight = 0
+        self._running_keys = {}
+        self._tasks = set()
+        self._closed = False
+        self.dropped = 0
+        self.coalesced = 0
+        self.completed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of analyses waiting for a slot."""
+        return len(self._queue)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of analyses currently running."""
+        return self._in_flight
+
+    async def async_submit(self, key, job_factory):
+        """
+        Run job_factory() once a slot is free and return its result.
+
+        Raises AnalysisDropped if the job is dropped before it gets to run.
+        """
+        if self._closed:
+            raise AnalysisDropped(f"Analysis for {key} was dropped because the integration is unloading")
+        future = self.hass.loop.create_future()
+
+        queued = self._find_queued(key) if self.coalesce else None
+        if queued is not None:
+            # Latest wins: the waiting analysis now runs the newest call for both callers
+            queued.job_factory = job_factory
+            queued.futures.append(future)
+            self.coalesced += 1
+            _LOGGER.debug("Coalesced analysis for %s into the queued one", key)
+        else:
+            job = _Job(key, job_factory, future)
+            if self._can_start(job) and not self._queue:
+                self._start(job)
+            else:
+                self._enqueue(job)
+                self._drain()
+        self._notify()
+
+        return await future
+
+    def _find_queued(self, key):
+        """Return the queued job for a key, if any."""
+        for queued in self._queue:
+            if queued.key == key:
+                return queued
+        return None
+
+    def _can_start(self, job) -> bool:
+        """Return True if a job may start now."""
+        if self._in_flight >= self.max_in_flight:
+            return False
+        # In coalescing mode a key never runs twice at the same time
+        return not (self.coalesce and job.key in self._running_keys)
+
+    def _drain(self):
+        """Start queued jobs while there are free slots."""
+        index = 0
+        while index < len(self._queue) and self._in_flight < self.max_in_flight:
+            job = self._queue[index]
+            if self._can_start(job):
+                del self._queue[index]
+                self._start(job)
+            else:
+                index += 1
+
+    def _enqueue(self, job):
+        """Add a job to the wait queue, applying the overflow policy if it is full."""
+        if len(self._queue) < self.queue_size:
+            self._queue.append(job)
+            return
+
+        if self.overflow_policy == OVERFLOW_COALESCE:
+            queued = self._find_queued(job.key)
+            if queued is not None:
+                # Latest wins: run the newest call and answer both callers with its result
+                queued.job_factory = job.job_factory
+                queued.futures.extend(job.futures)
+                self.coalesced += 1
+                _LOGGER.debug("Coalesced queued analysis for %s", job.key)
+                return
+
+        if self.overflow_policy == OVERFLOW_DROP_NEWEST:
+            self._drop(job)
+            return
+
+        # drop_oldest, or coalesce without a matching queued job
+        if self._queue:
+            oldest = self._queue.popleft()
+            self._queue.append(job)
+            self._drop(oldest)
+        else:
+            self._drop(job)
+
+    def _drop(self, job):
+        """Reject all callers waiting on a job."""
+        self.dropped += 1
+        _LOGGER.warning(
+            "Analysis queue full (%s waiting, %s running); dropping analysis for %s",
+            len(self._queue), self._in_flight, job.key
+        )
+        for future in job.futures:
+            if not future.done():
+                future.set_exception(AnalysisDropped(f"Analysis for {job.key} was dropped because the queue is full"))
+
+    def _start(self, job):
+        """Start a job in the background."""
+        self._in_flight += 1
+        self._running_keys[job.key] = self._running_keys.get(job.key, 0) + 1
+        task = self.hass.async_create_background_task(
+            self._async_run(job), f"ollama_vision analysis {job.key}"
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_run(self, job):
+        """Run a job, hand its outcome to the waiting callers and admit the next one."""
+        try:
+            result = await job.job_factory()
+        except asyncio.CancelledError:
+            for future in job.futures:
+                future.cancel()
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for future in job.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            self.completed += 1
+            if self._running_keys[job.key] <= 1:
+                del self._running_keys[job.key]
+            else:
+                self._running_keys[job.key] -= 1
+            self._drain()
+            self._notify()
+
+    async def async_shutdown(self):
+        """Drop queued jobs, cancel running ones and refuse new ones."""
+        self._closed = True
+        while self._queue:
+            for future in self._queue.popleft().futures:
+                future.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _notify(self):
+        """Tell listeners that the queue statistics changed."""
+        if self._update_callback is not None:
+            self._update_callback()
@@ -1,9 +1,15 @@
 """Sensor platform for Ollama Vision."""
-from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, PERCENTAGE, STATE_UNAVAILABLE, STATE_UNKNOWN, UnitOfTime
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry
+from homeassistant.helpers.entity_registry import (
+    async_entries_for_config_entry,
+    async_get as async_get_entity_registry,
+)
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.util import slugify
 import logging
 
@@ -17,6 +23,7 @@ from .const import (
     CONF_MODEL,
     CONF_HOST,
     INTEGRATION_NAME,
+    SIGNAL_STATS_UPDATED,
 )
 
 async def async_setup_entry(
@@ -28,7 +35,14 @@ async def async_setup_entry(
     hass.data[DOMAIN][entry.entry_id]["async_add_entities"] = async_add_entities
     
     # Create the info sensors
-    entities = [OllamaVisionInfoSensor(hass, entry)]
+    entities = [
+        OllamaVisionInfoSensor(hass, entry),
+        OllamaVisionQueueSensor(hass, entry),
+        OllamaVisionCacheSensor(hass, entry),
+        OllamaVisionLatencySensor(hass, entry, 50),
+        OllamaVisionLatencySensor(hass, entry, 95),
+        OllamaVisionThroughputSensor(hass, entry),
+    ]
     text_model_enabled = entry.options.get(
         CONF_TEXT_MODEL_ENABLED, 
         entry.data.get(CONF_TEXT_MODEL_ENABLED, False)
@@ -39,44 +53,31 @@ async def async_setup_entry(
     # Initialize the created_sensors dict if it doesn't exist
     hass.data[DOMAIN].setdefault("created_sensors", {})
     
-    # Re-create previously created image sensors after a restart
+    # Re-create previously created image sensors after a restart. Only this entry's
+    # registry entries are looked at (the registry indexes them by config entry), and
+    # each sensor restores its last description itself.
     entity_registry = async_get_entity_registry(hass)
-    existing_entities = entity_registry.entities
-    
-    # Look for our image sensors in the entity registry
-    for entity_id, entry_data in existing_entities.items():
-        if entry_data.platform != DOMAIN or not entry_data.unique_id.startswith(f"{entry.entry_id}_"):
-            continue
-            
-        # This is one of our image sensors
-        if entry_data.unique_id == f"{DOMAIN}_{entry.entry_id}_vision_info" or entry_data.unique_id == f"{DOMAIN}_{entry.entry_id}_text_info":
-            # Skip the info sensors
+    prefix = f"{entry.entry_id}_"
+    for registry_entry in async_entries_for_config_entry(entity_registry, entry.entry_id):
+        # Image sensors are "<entry_id>_<slugified image name>", the others start with the domain
+        if registry_entry.domain != "sensor" or not registry_entry.unique_id.startswith(prefix):
             continue
-            
-        # Extract image name from the unique_id
-        unique_id_parts = entry_data.unique_id.split('_', 1)
-        if len(unique_id_parts) == 2:
-            # Create a sensor for this existing entity
-            image_name = entity_id.split('.', 1)[1]  # Remove the domain prefix
+        
+        image_name = registry_entry.unique_id[len(prefix):]
+        if registry_entry.unique_id not in hass.data[DOMAIN]["created_sensors"]:
             sensor = OllamaVisionImageSensor(hass, entry, image_name)
-            
-            # Store in our tracking dict
-            if sensor.unique_id not in hass.data[DOMAIN]["created_sensors"]:
-                entities.append(sensor)
-                hass.data[DOMAIN]["created_sensors"][sensor.unique_id] = sensor
-                hass.data[DOMAIN][entry.entry_id].setdefault("sensors", {})[image_name] = sensor
+            entities.append(sensor)
+            hass.data[DOMAIN][entry.entry_id].setdefault("sensors", {})[image_name] = sensor
     
     async_add_entities(entities, True)
     
     @callback
-    async def async_create_sensor_from_event(event):
+    def async_create_sensor_from_event(event):
         """Create a new sensor or update an existing one when an image is analyzed."""
         entry_id = event.data["entry_id"]
         image_name = event.data["image_name"]
-        
-        entry = hass.config_entries.async_get_entry(entry_id)
-        if entry is None:
-            _LOGGER.error(f"No config entry found for {entry_id}")
+        if entry_id != entry.entry_id:
+            # Handled by that entry's own listener
             return
         
         # Generate a proper unique_id
@@ -101,13 +102,17 @@ async def async_setup_entry(
             async_add_entities = hass.data[DOMAIN][entry_id]["async_add_entities"]
             async_add_entities([sensor], True)
     
-    # Register event listener
-    hass.bus.async_listen(f"{DOMAIN}_create_sensor", async_create_sensor_from_event)
+    # Register event listener (one per entry, removed when the entry is unloaded)
+    entry.async_on_unload(
+        hass.bus.async_listen(f"{DOMAIN}_create_sensor", async_create_sensor_from_event)
+    )
 
 
 class OllamaVisionInfoSensor(SensorEntity):
     """Information sensor for the Ollama Vision model."""
     
+    _attr_should_poll = False
+    
     def __init__(self, hass, entry):
         """Initialize the sensor."""
         self.hass = hass
@@ -118,6 +123,27 @@ class OllamaVisionInfoSensor(SensorEntity):
         self._attr_icon = "mdi:information-outline"
         self._attr_native_value = f"{config[CONF_MODEL]} @ {config[CONF_HOST]}"
     
+    @property
+    def extra_state_attributes(self):
+        """Return the state of every vision server."""
+        client = self.hass.data[DOMAIN][self.entry.entry_id]["client"]
+        pool = client.vision_pool
+        return {
+            "circuit": pool.state,
+            "model_loaded": pool.loaded(client.model),
+            "backends": [backend.as_dict() for backend in pool.backends],
+        }
+    
+    async def async_added_to_hass(self):
+        """Subscribe to server health, circuit breaker and loaded model updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
     @property
     def device_info(self):
         """Return the device info."""
@@ -127,6 +153,8 @@ class OllamaVisionInfoSensor(SensorEntity):
 class OllamaTextModelInfoSensor(SensorEntity):
     """Information sensor for the Ollama Text model."""
     
+    _attr_should_poll = False
+    
     def __init__(self, hass, entry):
         """Initialize the sensor."""
         self.hass = hass
@@ -137,13 +165,241 @@ class OllamaTextModelInfoSensor(SensorEntity):
         self._attr_icon = "mdi:information-outline"
         self._attr_native_value = f"{config[CONF_TEXT_MODEL]} @ {config[CONF_TEXT_HOST]}"
     
+    @property
+    def extra_state_attributes(self):
+        """Return the state of every text model server."""
+        client = self.hass.data[DOMAIN][self.entry.entry_id]["client"]
+        pool = client.text_pool
+        return {
+            "circuit": pool.state,
+            "model_loaded": pool.loaded(client.text_model),
+            "backends": [backend.as_dict() for backend in pool.backends],
+        }
+    
+    async def async_added_to_hass(self):
+        """Subscribe to server health, circuit breaker and loaded model updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["device_info"]
+
+
+class OllamaVisionQueueSensor(SensorEntity):
+    """Diagnostic sensor showing how many analyses are waiting for a slot."""
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_should_poll = False
+    
+    def __init__(self, hass, entry):
+        """Initialize the sensor."""
+        self.hass = hass
+        self.entry = entry
+        config = hass.data[DOMAIN][entry.entry_id]["config"]
+        self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_queue"
+        self._attr_name = f"Analysis queue {config['name']}"
+        self._attr_icon = "mdi:tray-full"
+    
+    @property
+    def native_value(self):
+        """Return the number of queued analyses."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["scheduler"].queue_depth
+    
+    @property
+    def extra_state_attributes(self):
+        """Return the scheduler statistics."""
+        scheduler = self.hass.data[DOMAIN][self.entry.entry_id]["scheduler"]
+        attributes = {
+            "in_flight": scheduler.in_flight,
+            "max_in_flight": scheduler.max_in_flight,
+            "queue_size": scheduler.queue_size,
+            "overflow_policy": scheduler.overflow_policy,
+            "dropped": scheduler.dropped,
+            "coalesced": scheduler.coalesced,
+            "completed": scheduler.completed,
+        }
+        text_scheduler = self.hass.data[DOMAIN][self.entry.entry_id]["text_scheduler"]
+        if text_scheduler is not None:
+            # Text elaborations that were pipelined behind the vision model
+            attributes.update({
+                "text_queue_depth": text_scheduler.queue_depth,
+                "text_in_flight": text_scheduler.in_flight,
+                "text_dropped": text_scheduler.dropped,
+            })
+        return attributes
+    
+    async def async_added_to_hass(self):
+        """Subscribe to scheduler updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["device_info"]
+
+
+class OllamaVisionCacheSensor(SensorEntity):
+    """Diagnostic sensor showing the result cache hit rate."""
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_should_poll = False
+    
+    def __init__(self, hass, entry):
+        """Initialize the sensor."""
+        self.hass = hass
+        self.entry = entry
+        config = hass.data[DOMAIN][entry.entry_id]["config"]
+        self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_cache"
+        self._attr_name = f"Result cache hit rate {config['name']}"
+        self._attr_icon = "mdi:cached"
+    
+    @property
+    def native_value(self):
+        """Return the percentage of lookups answered from the cache."""
+        cache = self.hass.data[DOMAIN][self.entry.entry_id]["cache"]
+        lookups = cache.hits + cache.misses
+        if not lookups:
+            return None
+        return round(100 * cache.hits / lookups, 1)
+    
+    @property
+    def extra_state_attributes(self):
+        """Return the cache statistics."""
+        cache = self.hass.data[DOMAIN][self.entry.entry_id]["cache"]
+        return {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "entries": len(cache),
+            "max_entries": cache.max_entries,
+            "ttl": cache.ttl,
+        }
+    
+    async def async_added_to_hass(self):
+        """Subscribe to cache updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
     @property
     def device_info(self):
         """Return the device info."""
         return self.hass.data[DOMAIN][self.entry.entry_id]["device_info"]
 
 
-class OllamaVisionImageSensor(SensorEntity):
+class OllamaVisionLatencySensor(SensorEntity):
+    """Diagnostic sensor showing a percentile of the analysis time over recent analyses."""
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 2
+    _attr_should_poll = False
+    
+    def __init__(self, hass, entry, percent):
+        """Initialize the sensor."""
+        self.hass = hass
+        self.entry = entry
+        self.percent = percent
+        config = hass.data[DOMAIN][entry.entry_id]["config"]
+        self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_latency_p{percent}"
+        self._attr_name = f"Analysis time p{percent} {config['name']}"
+        self._attr_icon = "mdi:timer-outline"
+    
+    @property
+    def native_value(self):
+        """Return the percentile of the total analysis time."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["metrics"].latency(self.percent)
+    
+    @property
+    def extra_state_attributes(self):
+        """Return the time to first token and the average time per stage."""
+        metrics = self.hass.data[DOMAIN][self.entry.entry_id]["metrics"]
+        return {
+            "first_token": metrics.first_token(self.percent),
+            "stage_averages": metrics.stage_averages(),
+            "samples": metrics.samples,
+            "window": metrics.window,
+            "analyses": metrics.analyses,
+            "reused": metrics.reused,
+        }
+    
+    async def async_added_to_hass(self):
+        """Subscribe to metric updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["device_info"]
+
+
+class OllamaVisionThroughputSensor(SensorEntity):
+    """Diagnostic sensor showing the vision model's generation speed over recent analyses."""
+    
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = "tokens/s"
+    _attr_suggested_display_precision = 1
+    _attr_should_poll = False
+    
+    def __init__(self, hass, entry):
+        """Initialize the sensor."""
+        self.hass = hass
+        self.entry = entry
+        config = hass.data[DOMAIN][entry.entry_id]["config"]
+        self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_tokens_per_second"
+        self._attr_name = f"Vision tokens per second {config['name']}"
+        self._attr_icon = "mdi:speedometer"
+    
+    @property
+    def native_value(self):
+        """Return the average number of tokens generated per second."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["metrics"].tokens_per_second
+    
+    async def async_added_to_hass(self):
+        """Subscribe to metric updates."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_STATS_UPDATED.format(self.entry.entry_id),
+                self.async_write_ha_state,
+            )
+        )
+    
+    @property
+    def device_info(self):
+        """Return the device info."""
+        return self.hass.data[DOMAIN][self.entry.entry_id]["device_info"]
+
+
+class OllamaVisionImageSensor(SensorEntity, RestoreEntity):
     """Sensor representing an image analyzed by Ollama Vision."""
     
     def __init__(self, hass, entry, image_name):
@@ -171,18 +427,11 @@ class OllamaVisionImageSensor(SensorEntity):
     
     @callback
     def async_update_from_pending(self):
-        """Fetch the latest data from pending_sensors."""
-        pending_sensors = self.hass.data[DOMAIN].get("pending_sensors", {})
-        entry_sensors = pending_sensors.get(self.entry_id, {})
-        
-        # Try to find the sensor data using both the original name and the slugified name
-        sensor_data = entry_sensors.get(self.image_name)
-        if not sensor_data:
-            # Try with the unslugified version from the name attribute
-            for key, data in entry_sensors.items():
-                if slugify(key) == slugify(self.image_name):
-                    sensor_data = data
-                    break
+        """Fetch the latest data from the entry's result store."""
+        entry_data = self.hass.data[DOMAIN].get(self.entry_id)
+        if entry_data is None:
+            return
+        sensor_data = entry_data["results"].get(self._attr_unique_id)
         
         if sensor_data:
             description = sensor_data.get("description")
@@ -194,17 +443,30 @@ class OllamaVisionImageSensor(SensorEntity):
                 "image_url": sensor_data.get("image_url"),
                 "prompt": sensor_data.get("prompt"),
                 "full_description": description,  # Store the full description
+                "cache_hit": sensor_data.get("cache_hit", False),
+                "scene_reused": sensor_data.get("scene_reused", False),
+                "scene_distance": sensor_data.get("scene_distance"),
+                "streaming": sensor_data.get("streaming", False),
             }
+            if sensor_data.get("failed"):
+                attributes["failed"] = True
+            if sensor_data.get("image_urls"):
+                attributes["image_urls"] = sensor_data["image_urls"]
+            if sensor_data.get("structured_data") is not None:
+                attributes["structured_data"] = sensor_data["structured_data"]
             
             if sensor_data.get("used_text_model"):
                 attributes.update({
                     "used_text_model": True,
                     "text_prompt": sensor_data.get("text_prompt"),
-                    "final_description": sensor_data.get("final_description")
+                    "final_description": sensor_data.get("final_description"),
+                    "elaborating": sensor_data.get("elaborating", False),
                 })
             
             self._attr_extra_state_attributes = attributes
-            self.async_write_ha_state()
+            if self.entity_id is not None:
+                # Not yet added: async_added_to_hass writes the state
+                self.async_write_ha_state()
             
             _LOGGER.debug(f"Updated sensor {self._attr_unique_id} with new data")
     
@@ -217,6 +479,33 @@ class OllamaVisionImageSensor(SensorEntity):
         """When entity is added to hass."""
         # Fetch initial data after entity registration
         self.async_update_from_pending()
+        if self._attr_native_value is not None:
+            return
+        
+        # Restored after a restart or reload: show the last description until the next analysis
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE):
+            return
+        self._attr_native_value = last_state.state
+        self._attr_extra_state_attributes = {
+            key: value
+            for key, value in last_state.attributes.items()
+            if key not in ("friendly_name", "icon")
+        }
+        # An analysis interrupted by the restart won't finish
+        for key in ("streaming", "elaborating"):
+            if key in self._attr_extra_state_attributes:
+                self._attr_extra_state_attributes[key] = False
+        self.async_write_ha_state()
+    
+    async def async_will_remove_from_hass(self):
+        """Forget the sensor and its stored result when it is removed or unloaded."""
+        self.hass.data[DOMAIN].get("created_sensors", {}).pop(self._attr_unique_id, None)
+        entry_data = self.hass.data[DOMAIN].get(self.entry_id)
+        if entry_data is not None:
+            entry_data["results"].remove(self._attr_unique_id)
+            if entry_data.get("sensors", {}).get(self.image_name) is self:
+                del entry_data["sensors"][self.image_name]
     
     @property
     def device_info(self):
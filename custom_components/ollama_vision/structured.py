@@ -0,0 +1,57 @@
+"""Incremental parsing of structured (JSON) answers requested with Ollama's format parameter."""
+import json
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JSONCompletion:
+    """
+    Follow a JSON answer as it is streamed and tell when its top-level value is complete.
+
+    Only brackets and string boundaries are tracked, so each character is looked at once.
+    Once the outermost object or array is closed, the rest of the stream can only be
+    whitespace, and the request can be stopped instead of waiting for the model to finish.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self.complete = False
+
+    def feed(self, text: str) -> bool:
+        """Feed the next piece of the answer and return True once the value is complete."""
+        if self.complete:
+            return True
+        for char in text:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                self._started = True
+            elif char in "}]":
+                self._depth -= 1
+                if self._started and self._depth == 0:
+                    self.complete = True
+                    return True
+        return False
+
+
+def parse_structured(text: str):
+    """Return the JSON value of a structured answer, or None if it isn't valid JSON."""
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError as exc:
+        _LOGGER.warning("Structured answer is not valid JSON: %s", exc)
+        return None
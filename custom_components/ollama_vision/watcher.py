@@ -0,0 +1,173 @@
+"""Watch directories for new or changed snapshots and hand them on once they are complete."""
+import fnmatch
+import logging
+import os
+from datetime import timedelta
+from functools import partial
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+try:
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional, fall back to polling the directories
+    Observer = None
+
+from .const import WATCH_POLL_INTERVAL, WATCH_SETTLE_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+# File system events that mean a file was written or moved into place
+_WRITE_EVENTS = ("created", "modified", "moved", "closed")
+
+
+def _file_signature(path: str):
+    """Return (mtime_ns, size) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _scan(directories: list) -> dict:
+    """Return {path: (mtime_ns, size)} for the files in the directories (runs in the executor)."""
+    files = {}
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError as exc:
+            _LOGGER.debug("Could not scan %s: %s", directory, exc)
+    return files
+
+
+class _EventHandler:
+    """Pass watchdog events from its thread to the watcher in the event loop."""
+
+    def __init__(self, hass, on_change):
+        self._hass = hass
+        self._on_change = on_change
+
+    def dispatch(self, event):
+        """Handle one file system event (called in the observer thread)."""
+        if event.is_directory or event.event_type not in _WRITE_EVENTS:
+            return
+        path = getattr(event, "dest_path", None) or event.src_path
+        self._hass.loop.call_soon_threadsafe(self._on_change, os.fsdecode(path))
+
+
+class DirectoryWatcher:
+    """
+    Call on_file for every new or changed file in some directories that matches a pattern.
+
+    Uses inotify (through watchdog) when it is installed and polls the directories every
+    WATCH_POLL_INTERVAL seconds otherwise. Subdirectories are not watched. Files that
+    already exist when watching starts are ignored.
+
+    A file is only handed on once it has settled: debounce seconds after its last change,
+    and only if its size and modification time stay the same for another
+    WATCH_SETTLE_INTERVAL seconds, so files that are still being written are skipped
+    until they are complete.
+
+    on_file runs as a background task of the config entry, so unloading the entry cancels it.
+    """
+
+    def __init__(self, hass, entry, directories, patterns, debounce, on_file):
+        self.hass = hass
+        self.entry = entry
+        self.directories = directories
+        self.patterns = [pattern.lower() for pattern in patterns]
+        self.debounce = debounce
+        self._on_file = on_file
+        self._observer = None
+        self._unsub_poll = None
+        self._files = {}
+        self._pending = {}  # path: cancel callback of the scheduled check
+        self._signatures = {}  # path: (mtime_ns, size) at the last check
+        self._stopped = False
+
+    async def async_start(self):
+        """Start watching."""
+        if Observer is not None:
+            self._observer = Observer()
+            handler = _EventHandler(self.hass, self._async_file_changed)
+            for directory in self.directories:
+                self._observer.schedule(handler, directory, recursive=False)
+            await self.hass.async_add_executor_job(self._observer.start)
+            _LOGGER.debug("Watching %s for snapshots", ", ".join(self.directories))
+        else:
+            self._files = await self.hass.async_add_executor_job(_scan, self.directories)
+            self._unsub_poll = async_track_time_interval(
+                self.hass, self._async_poll, timedelta(seconds=WATCH_POLL_INTERVAL)
+            )
+            _LOGGER.debug("Polling %s for snapshots (watchdog not installed)", ", ".join(self.directories))
+
+    @callback
+    def async_stop(self):
+        """Stop watching and drop the files waiting to settle."""
+        self._stopped = True
+        if self._observer is not None:
+            self._observer.stop()
+            self.hass.async_add_executor_job(self._observer.join)
+            self._observer = None
+        if self._unsub_poll is not None:
+            self._unsub_poll()
+            self._unsub_poll = None
+        for cancel in self._pending.values():
+            cancel()
+        self._pending.clear()
+        self._signatures.clear()
+
+    async def _async_poll(self, now=None):
+        """Look for files that are new or changed since the last poll."""
+        files = await self.hass.async_add_executor_job(_scan, self.directories)
+        if self._stopped:
+            return
+        for path, signature in files.items():
+            if self._files.get(path) != signature:
+                self._async_file_changed(path)
+        self._files = files
+
+    def _matches(self, path: str) -> bool:
+        """Return True if a file name matches one of the patterns."""
+        name = os.path.basename(path).lower()
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns)
+
+    @callback
+    def _async_file_changed(self, path: str):
+        """Restart the debounce timer of a file that was written."""
+        if self._stopped or not self._matches(path):
+            return
+        cancel = self._pending.pop(path, None)
+        if cancel is not None:
+            cancel()
+        self._signatures.pop(path, None)
+        self._pending[path] = async_call_later(self.hass, self.debounce, partial(self._async_check, path))
+
+    async def _async_check(self, path: str, now=None):
+        """Hand a file on if it hasn't changed since the last check, otherwise check again."""
+        self._pending.pop(path, None)
+        signature = await self.hass.async_add_executor_job(_file_signature, path)
+        if self._stopped:
+            return
+        if path in self._pending:
+            # Written again while we were looking
+            return
+        if signature is None or signature[1] == 0:
+            # Deleted, or created but not written yet
+            self._signatures.pop(path, None)
+            return
+        if signature != self._signatures.get(path):
+            self._signatures[path] = signature
+            self._pending[path] = async_call_later(
+                self.hass, WATCH_SETTLE_INTERVAL, partial(self._async_check, path)
+            )
+            return
+        del self._signatures[path]
+        self.entry.async_create_background_task(
+            self.hass, self._on_file(path), f"ollama_vision watched file {path}"
+        )